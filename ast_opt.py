@@ -0,0 +1,142 @@
+"""
+AST simplification pass
+Folds constant arithmetic and trivial algebraic identities after parsing
+"""
+
+from fractions import Fraction
+
+# Identity-element checks only ever see 'number' leaves, whose values are
+# unsigned literal strings; Fraction parses both '3' and '2.5' exactly.
+
+
+def _is_zero(ast):
+    return ast[0] == 'number' and Fraction(ast[1]) == 0
+
+
+def _is_one(ast):
+    return ast[0] == 'number' and Fraction(ast[1]) == 1
+
+
+def _const_value(ast):
+    """Exact Fraction value of a constant numeric subtree, or None.
+
+    Only number/unary/binop nodes count as constant here; anything touching
+    variables, calls, i or matrices returns None. Division/modulo by zero
+    and non-integer exponents also bail to None so evaluation still raises
+    the evaluator's own errors.
+    """
+    kind = ast[0]
+    if kind == 'number':
+        return Fraction(ast[1])
+    if kind == 'unary':
+        if ast[1] != '-':
+            return None
+        val = _const_value(ast[2])
+        return -val if val is not None else None
+    if kind == 'binop':
+        left = _const_value(ast[2])
+        if left is None:
+            return None
+        right = _const_value(ast[3])
+        if right is None:
+            return None
+        op = ast[1]
+        if op == '+':
+            return left + right
+        if op == '-':
+            return left - right
+        if op == '*':
+            return left * right
+        if op == '/':
+            return left / right if right != 0 else None
+        if op == '%':
+            return left % right if right != 0 else None
+        if op == '^':
+            if right.denominator != 1 or not (-64 <= right.numerator <= 64):
+                return None
+            if right.numerator < 0 and left == 0:
+                return None
+            return left ** right.numerator
+        return None
+    return None
+
+
+def _int_node(n):
+    """AST node for an integer constant (parser shape: unsigned literal)."""
+    if n < 0:
+        return ('unary', '-', ('number', str(-n)))
+    return ('number', str(n))
+
+
+def simplify(ast):
+    """Simplify an expression AST.
+
+    Folds constant subtrees that reduce to integers, strips the additive
+    and multiplicative identities (x+0, 0+x, x-0, x*1, 1*x, x/1, x^1) and
+    cancels double negation. Rewrites only where something changes;
+    untouched subtrees are shared with the input, so evaluators and
+    renderers keep benefiting from structural sharing.
+    """
+    if ast is None:
+        return None
+    kind = ast[0]
+
+    if kind == 'binop':
+        op = ast[1]
+        left = simplify(ast[2])
+        right = simplify(ast[3])
+        node = ast if (left is ast[2] and right is ast[3]) else ('binop', op, left, right)
+        val = _const_value(node)
+        if val is not None and val.denominator == 1:
+            return _int_node(val.numerator)
+        if op == '+':
+            if _is_zero(left):
+                return right
+            if _is_zero(right):
+                return left
+        elif op == '-':
+            if _is_zero(right):
+                return left
+        elif op == '*':
+            if _is_one(left):
+                return right
+            if _is_one(right):
+                return left
+        elif op in ('/', '^'):
+            # x/1 and x^1 are identities for every operand type (A^1 = A)
+            if _is_one(right):
+                return left
+        return node
+
+    if kind == 'unary':
+        operand = simplify(ast[2])
+        if ast[1] == '-' and operand[0] == 'unary' and operand[1] == '-':
+            # -(-x) -> x
+            return operand[2]
+        return ast if operand is ast[2] else ('unary', ast[1], operand)
+
+    if kind == 'call':
+        arg = simplify(ast[2])
+        return ast if arg is ast[2] else ('call', ast[1], arg)
+
+    if kind == 'matrix':
+        return ('matrix', [[simplify(elem) for elem in row] for row in ast[1]])
+
+    # number, variable, imaginary: already minimal
+    return ast
+
+
+def simplify_statement(ast):
+    """Apply simplify to the expression parts of a parsed statement."""
+    if ast is None:
+        return None
+    kind = ast[0]
+    if kind == 'assign':
+        return ('assign', ast[1], simplify(ast[2]))
+    if kind == 'fun_assign':
+        return ('fun_assign', ast[1], ast[2], simplify(ast[3]))
+    if kind == 'equation':
+        left = simplify(ast[1])
+        right = simplify(ast[2]) if ast[2] is not None else None
+        return ('equation', left, right)
+    return simplify(ast)
@@ -8,6 +8,8 @@ import sys
 import os
 import atexit
 import json
+import queue
+import threading
 from datetime import datetime
 
 from interpreter import Interpreter
@@ -18,6 +20,9 @@ except Exception:
     # readline may not be available in some environments (Windows without pyreadline)
     readline = None
 
+# Command-result history lines are handed to a daemon writer thread through a
+# queue, so the REPL returns to the prompt without waiting on disk I/O.
+
 
 def main():
     """Main entry point for the computor v2 interpreter."""
@@ -28,25 +33,84 @@ def main():
     history_file = os.path.expanduser(os.getenv("COMPUTOR_HISTORY", "~/.computor_history"))
     # Command -> result history (JSONL). Stores objects: {time: iso, cmd: str, result: str}
     history_results_file = os.path.expanduser(os.getenv("COMPUTOR_HISTORY_RESULTS", "~/.computor_history_results"))
-    history_entries = []
+    # Raw JSONL lines; decoded lazily when a history command needs them so
+    # startup does a single file read and no JSON parsing at all.
+    history_lines = []
 
-    # Load existing command-result history (if any)
+    # Load existing command-result history (if any). Read the file in one
+    # call and split in memory: much cheaper than per-line iteration with
+    # strip() for large histories.
     try:
         if os.path.exists(history_results_file):
             with open(history_results_file, 'r', encoding='utf-8') as hf:
-                for line in hf:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        obj = json.loads(line)
-                        history_entries.append(obj)
-                    except Exception:
-                        # ignore malformed lines
-                        continue
+                data = hf.read()
+            history_lines = [line for line in data.split('\n') if line]
     except Exception:
         # don't fail startup for history read errors
-        history_entries = []
+        history_lines = []
+
+    def decode_history():
+        """Decode stored history lines on demand, skipping malformed ones."""
+        loads = json.loads
+        entries = []
+        for line in history_lines:
+            try:
+                entries.append(loads(line))
+            except Exception:
+                # ignore malformed lines
+                continue
+        return entries
+
+    # Open the history file once for the session. Writes happen on a daemon
+    # thread fed by a queue: the REPL's per-command cost is a queue.put, and
+    # the writer flushes whenever it catches up with the queue.
+    try:
+        hr_dir = os.path.dirname(history_results_file)
+        if hr_dir and not os.path.exists(hr_dir):
+            os.makedirs(hr_dir, exist_ok=True)
+        history_fh = open(history_results_file, 'a', encoding='utf-8')
+    except Exception:
+        history_fh = None
+    hist_q = queue.Queue()
+
+    def _history_writer():
+        while True:
+            item = hist_q.get()
+            try:
+                history_fh.write(item)
+                if hist_q.empty():
+                    history_fh.flush()
+            except Exception:
+                pass
+            finally:
+                hist_q.task_done()
+
+    if history_fh is not None:
+        threading.Thread(target=_history_writer, daemon=True).start()
+
+    def flush_history():
+        """Block until all queued history lines are on disk."""
+        if history_fh is None:
+            return
+        try:
+            hist_q.join()
+            history_fh.flush()
+        except Exception:
+            pass
+
+    def record_history(cmd, result):
+        """Append a command-result entry to memory and the writer queue."""
+        entry = {"time": datetime.utcnow().isoformat() + "Z", "cmd": cmd, "result": str(result)}
+        try:
+            raw = json.dumps(entry, ensure_ascii=False)
+        except Exception:
+            return
+        history_lines.append(raw)
+        if history_fh is not None:
+            hist_q.put(raw + "\n")
+
+    atexit.register(flush_history)
+
     if readline:
             # Ensure history directory exists (if user provided a path with dirs)
             history_dir = os.path.dirname(history_file)
@@ -67,6 +131,13 @@ def main():
             except Exception:
                 pass
 
+            # We add entries manually (with dedup) in the REPL loop; auto
+            # history would add each input a second time.
+            try:
+                readline.set_auto_history(False)
+            except Exception:
+                pass
+
             # Write history on exit
             def _write_history():
                 try:
@@ -75,22 +146,6 @@ def main():
                     pass
 
             atexit.register(_write_history)
-            # Also flush command-result history on exit
-            def _write_hist_results():
-                try:
-                    # ensure directory exists
-                    hr_dir = os.path.dirname(history_results_file)
-                    if hr_dir and not os.path.exists(hr_dir):
-                        os.makedirs(hr_dir, exist_ok=True)
-                    # append any in-memory entries that weren't persisted
-                    # (we persist per-command below, so this is a no-op in normal flow)
-                    with open(history_results_file, 'a', encoding='utf-8') as hf:
-                        for entry in history_entries:
-                            hf.write(json.dumps(entry, ensure_ascii=False) + "\n")
-                except Exception:
-                    pass
-
-            atexit.register(_write_hist_results)
     if len(sys.argv) > 1:
         # Execute command from arguments
         command = ' '.join(sys.argv[1:])
@@ -98,15 +153,7 @@ def main():
             result = interpreter.execute(command)
             if result is not None:
                 print(result)
-            # persist command+result to history_results_file
-            try:
-                entry = {"time": datetime.utcnow().isoformat() + "Z", "cmd": command, "result": str(result)}
-                # append to memory and file
-                history_entries.append(entry)
-                with open(history_results_file, 'a', encoding='utf-8') as hf:
-                    hf.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            except Exception:
-                pass
+            record_history(command, result)
         except Exception as e:
             print(f"Error: {e}", file=sys.stderr)
             sys.exit(1)
@@ -115,19 +162,22 @@ def main():
         print("Computor v2 - Mathematical Expression Interpreter")
         print("Type 'exit' or 'quit' to leave")
         print()
-        
+
+        last_history_line = None
         while True:
             try:
                 line = input("> ")
                 line = line.strip()
-                
+
                 if not line:
                     continue
-                # Add to readline history (if available)
+                # Add to readline history (if available), skipping immediate
+                # repeats so arrow-up re-execution doesn't pile up duplicate
+                # entries (and shrinks the exit-time write_history_file pass)
                 try:
-                    if readline:
-                        # avoid adding pure whitespace (already filtered) and keep history concise
+                    if readline and line != last_history_line:
                         readline.add_history(line)
+                        last_history_line = line
                 except Exception:
                     pass
                     
@@ -139,17 +189,19 @@ def main():
                     parts = line.split()
                     if len(parts) == 1:
                         # show commands only (numbered)
-                        if not history_entries:
+                        entries = decode_history()
+                        if not entries:
                             print("No history available")
                         else:
-                            for i, e in enumerate(history_entries, start=1):
+                            for i, e in enumerate(entries, start=1):
                                 print(f"{i}: {e.get('cmd')}")
                         continue
                     elif len(parts) == 2 and parts[1].lower() in ('results', 'all'):
-                        if not history_entries:
+                        entries = decode_history()
+                        if not entries:
                             print("No history available")
                         else:
-                            for i, e in enumerate(history_entries, start=1):
+                            for i, e in enumerate(entries, start=1):
                                 t = e.get('time', '')
                                 cmd = e.get('cmd', '')
                                 res = e.get('result', '')
@@ -157,9 +209,10 @@ def main():
                         continue
                     elif len(parts) == 2 and parts[1].lower() == 'clear':
                         try:
-                            # truncate history results file
+                            # wait for in-flight writes, then truncate the file
+                            flush_history()
                             open(history_results_file, 'w', encoding='utf-8').close()
-                            history_entries.clear()
+                            history_lines.clear()
                             print("History cleared")
                         except Exception:
                             print("Failed to clear history")
@@ -171,15 +224,8 @@ def main():
                 result = interpreter.execute(line)
                 if result is not None:
                     print(result)
-                    # persist command+result to history_results_file
-                    try:
-                        entry = {"time": datetime.utcnow().isoformat() + "Z", "cmd": line, "result": str(result)}
-                        history_entries.append(entry)
-                        with open(history_results_file, 'a', encoding='utf-8') as hf:
-                            hf.write(json.dumps(entry, ensure_ascii=False) + "\n")
-                    except Exception:
-                        pass
-                    
+                    record_history(line, result)
+
             except EOFError:
                 break
             except KeyboardInterrupt:
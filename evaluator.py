@@ -2,15 +2,43 @@
 Evaluator for mathematical expressions
 """
 
-from types_system import Rational, Complex, Matrix
+from types_system import Rational, Complex, Matrix, Function
 from typing import Dict, Any, Union
+from fractions import Fraction
+from collections import ChainMap
+import operator
 import math
 import cmath
 
+# Number literals are re-evaluated constantly (function bodies, repeated
+# lines); memoize literal string -> Rational so each distinct literal is
+# parsed once. Seeded with the small integers, capped to bound memory.
+_NUM_CACHE = {str(i): Rational(i) for i in range(10)}
+_NUM_CACHE_SIZE = 1024
+
+# Interned Rationals for the float results builtins produce most often
+# (cos(0) -> 1.0, sin(0) -> 0.0, ...); saves an allocation per such call.
+_RATIONAL_CACHE = {0.0: Rational.ZERO, 1.0: Rational.ONE, -1.0: Rational(-1)}
+
+# type -> converter table for _to_python_complex: one dict probe on the
+# concrete type replaces an isinstance chain per conversion.
+_TO_COMPLEX = {
+    Rational: lambda v: complex(float(v.value), 0.0),
+    Complex: lambda v: complex(float(v.real.value), float(v.imag.value)),
+    int: lambda v: complex(float(v), 0.0),
+    float: lambda v: complex(float(v), 0.0),
+}
+
 
 class Evaluator:
     """Evaluates parsed expressions."""
-    
+
+    # Bound on each Function's call-memoization dict (see _eval_call)
+    CALL_CACHE_SIZE = 1024
+    # Bound on the constant-subtree flag/value caches: long REPL sessions
+    # stream unique lines, so unbounded AST-keyed dicts would leak.
+    CONST_CACHE_SIZE = 1024
+
     def __init__(self, variables: Dict[str, Any] = None):
         # Store variables case-insensitively: keys are lowercase
         self.variables = {}
@@ -20,6 +48,15 @@ class Evaluator:
         # Angle mode for trigonometric functions: 'radians' or 'degrees'
         # Default: radians
         self.angle_mode = 'radians'
+        # Monotonic counter bumped on every assignment; used to invalidate
+        # per-Function call caches when any variable a body might reference
+        # has been reassigned.
+        self._env_version = 0
+        # Caches for constant-subtree evaluation: AST tuples that contain no
+        # variables or calls always evaluate to the same value, so re-walking
+        # them (e.g. on every call of a function body) is wasted work.
+        self._const_flags = {}
+        self._const_values = {}
 
         # Built-in functions (lowercase keys)
         # Each builtin is a Python callable that accepts one argument (Rational/Complex/int/float)
@@ -36,207 +73,553 @@ class Evaluator:
             'floor': self._builtin_floor,
             'ceil': self._builtin_ceil,
         }
-    
+
+        # Operator -> handler table for apply_binop; mirrors _eval_handlers.
+        # Plain arithmetic delegates straight to the C-level operator
+        # functions; ops with custom semantics keep their _op_* wrappers.
+        self._binop_handlers = {
+            '+': operator.add,
+            '-': operator.sub,
+            '*': self._op_mul,
+            '/': operator.truediv,
+            '%': self._op_mod,
+            '**': self._op_matmul,
+            'MATMUL': self._op_matmul,
+            '^': self._op_pow,
+        }
+
+        # Node-type -> handler table: a single dict lookup replaces the
+        # string-compare chain previously run for every AST node.
+        self._eval_handlers = {
+            'number': self._eval_number,
+            'variable': self._eval_variable,
+            'imaginary': self._eval_imaginary,
+            'matrix': self._eval_matrix,
+            'binop': self._eval_binop,
+            'unary': self._eval_unary,
+            'call': self._eval_call,
+        }
+
     def evaluate(self, ast):
         """Evaluate an AST node."""
         if ast is None:
             return None
-        
-        node_type = ast[0]
-        
-        if node_type == 'number':
-            value = ast[1]
-            if '.' in value:
-                return Rational(float(value))
-            return Rational(int(value))
-        
-        elif node_type == 'variable':
-            var_name = ast[1]
-            # Lookup variables case-insensitively via get_variable
-            val = self.get_variable(var_name)
-            if val is None:
-                raise NameError(f"Variable '{var_name}' is not defined")
-            return val
-        
-        elif node_type == 'imaginary':
-            return Complex(0, 1)
-        
-        elif node_type == 'matrix':
-            rows_ast = ast[1]
-            rows = []
-            for row_ast in rows_ast:
-                row = [self.evaluate(elem) for elem in row_ast]
-                # Convert to Rational if needed
-                row_values = []
-                for elem in row:
-                    if isinstance(elem, Rational):
-                        row_values.append(elem)
-                    elif isinstance(elem, (int, float)):
-                        row_values.append(Rational(elem))
-                    else:
-                        raise TypeError(f"Matrix elements must be rational numbers, got {type(elem)}")
-                rows.append(row_values)
-            return Matrix(rows)
-        
-        elif node_type == 'binop':
-            op = ast[1]
+        handler = self._eval_handlers.get(ast[0])
+        if handler is None:
+            raise ValueError(f"Unknown node type: {ast[0]}")
+        return handler(ast)
+
+    def compile_rpn(self, ast):
+        """Flatten an AST into a postfix (RPN) program.
+
+        The program is a list of (kind, payload) pairs:
+        - ('push', value): a precomputed constant subtree value
+        - ('node', ast):   a leaf evaluated through the normal handlers
+        - ('op', op):      a binary operator applied to the top two values
+        - ('unary', op):   a unary operator applied to the top value
+
+        Evaluating the flat program with evaluate_rpn avoids one Python
+        call frame per binop/unary node of the original tree.
+        """
+        program = []
+        append = program.append
+
+        def walk(node):
+            node_type = node[0]
+            if node_type in ('binop', 'unary'):
+                try:
+                    is_const = self._is_constant_ast(node)
+                except TypeError:
+                    is_const = False
+                if is_const:
+                    append(('push', self.evaluate(node)))
+                    return
+                if node_type == 'binop':
+                    if node[1] in ('**', 'MATMUL'):
+                        # keep matmul chains whole so _eval_binop can apply
+                        # the matrix-chain association DP
+                        append(('node', node))
+                        return
+                    walk(node[2])
+                    walk(node[3])
+                    append(('op', node[1]))
+                else:
+                    walk(node[2])
+                    append(('unary', node[1]))
+            elif node_type == 'number':
+                # Parse the literal once at compile time, not per evaluation
+                append(('push', self._eval_number(node)))
+            elif node_type == 'imaginary':
+                append(('push', Complex(0, 1)))
+            else:
+                append(('node', node))
+
+        if ast is not None:
+            walk(ast)
+        return program
+
+    def compile_closure(self, body_ast, arg_name):
+        """Lower a purely arithmetic function body to a Python closure.
+
+        Bodies built only from numbers, i, the function argument and the
+        scalar operators are emitted once as source for a one-argument
+        function and exec'd; calling the result runs straight-line CPython
+        bytecode on the value objects instead of walking the tree or the
+        RPN program per call. Returns None when the body references free
+        variables, matrices or other calls and must go through the normal
+        evaluator.
+        """
+        namespace = {'_mod': self._op_mod, '_pow': self._op_pow}
+        counter = [0]
+
+        def emit(node):
+            node_type = node[0]
+            if node_type == 'number' or node_type == 'imaginary':
+                name = f'_c{counter[0]}'
+                counter[0] += 1
+                namespace[name] = (Complex(0, 1) if node_type == 'imaginary'
+                                   else self._eval_number(node))
+                return name
+            if node_type == 'variable':
+                return '_arg' if node[1] == arg_name else None
+            if node_type == 'unary':
+                if node[1] != '-':
+                    return None
+                operand = emit(node[2])
+                return f'(-{operand})' if operand is not None else None
+            if node_type == 'binop':
+                op = node[1]
+                left = emit(node[2])
+                right = emit(node[3]) if left is not None else None
+                if right is None:
+                    return None
+                if op in ('+', '-', '*', '/'):
+                    return f'({left} {op} {right})'
+                if op == '%':
+                    return f'_mod({left}, {right})'
+                if op == '^':
+                    return f'_pow({left}, {right})'
+                return None
+            return None
+
+        expr = emit(body_ast)
+        if expr is None:
+            return None
+        try:
+            exec(f'def _compiled(_arg):\n    return {expr}', namespace)
+        except (SyntaxError, RecursionError, MemoryError):
+            # Every binop is parenthesized, so very long operator chains
+            # can exceed CPython's parser nesting limit; fall back to the
+            # RPN evaluator, which has no such depth limit.
+            return None
+        return namespace['_compiled']
+
+    def evaluate_rpn(self, program):
+        """Evaluate a postfix program produced by compile_rpn."""
+        stack = []
+        push = stack.append
+        handlers = self._eval_handlers
+        binops = self._binop_handlers
+        for kind, payload in program:
+            if kind == 'node':
+                push(handlers[payload[0]](payload))
+            elif kind == 'op':
+                right = stack.pop()
+                left = stack.pop()
+                push(binops[payload](left, right))
+            elif kind == 'push':
+                push(payload)
+            else:  # unary
+                if payload != '-':
+                    raise ValueError(f"Unknown unary operator: {payload}")
+                stack[-1] = -stack[-1]
+        return stack[-1] if stack else None
+
+    # --- per-node evaluation handlers ---
+    def _eval_number(self, ast):
+        value = ast[1]
+        cached = _NUM_CACHE.get(value)
+        if cached is not None:
+            return cached
+        num = Rational(float(value)) if '.' in value else Rational(int(value))
+        if len(_NUM_CACHE) < _NUM_CACHE_SIZE:
+            _NUM_CACHE[value] = num
+        return num
+
+    def _eval_variable(self, ast):
+        var_name = ast[1]
+        # Lookup variables case-insensitively via get_variable
+        val = self.get_variable(var_name)
+        if val is None:
+            raise NameError(f"Variable '{var_name}' is not defined")
+        return val
+
+    def _eval_imaginary(self, ast):
+        return Complex(0, 1)
+
+    def _eval_matrix(self, ast):
+        rows_ast = ast[1]
+        rows = []
+        for row_ast in rows_ast:
+            # Evaluate and convert in one pass instead of materializing an
+            # intermediate row list and re-walking it. type(...) is Rational
+            # is a pointer compare (no MRO walk) and covers the common case.
+            row_values = []
+            append = row_values.append
+            for elem_ast in row_ast:
+                elem = self.evaluate(elem_ast)
+                if type(elem) is Rational:
+                    append(elem)
+                elif isinstance(elem, (int, float)):
+                    append(Rational(elem))
+                else:
+                    raise TypeError(f"Matrix elements must be rational numbers, got {type(elem)}")
+            rows.append(row_values)
+        return Matrix(rows)
+
+    def _eval_binop(self, ast):
+        cached = self._constant_value(ast)
+        if cached is not None:
+            return cached
+        op = ast[1]
+        if op == '**' or op == 'MATMUL':
+            # Chained matmuls: gather the whole chain and let the
+            # matrix-chain DP pick the cheapest association.
+            operands = []
+            self._gather_matmul_operands(ast, operands)
+            value = self._matmul_chain(operands)
+        else:
             left = self.evaluate(ast[2])
             right = self.evaluate(ast[3])
-            return self.apply_binop(op, left, right)
-        
-        elif node_type == 'unary':
-            op = ast[1]
-            operand = self.evaluate(ast[2])
-            if op == '-':
-                return -operand
-            raise ValueError(f"Unknown unary operator: {op}")
-
-        elif node_type == 'call':
-            # Function call: ('call', name, arg_ast)
-            func_name = ast[1]
-            arg_ast = ast[2]
-            arg_value = self.evaluate(arg_ast)
-            func = self.get_variable(func_name)
-            if func is None:
-                raise NameError(f"Function '{func_name}' is not defined")
-            # Lazy: expect a Function object
-            from types_system import Function
-            # If it's a user-defined Function, evaluate its AST in a local evaluator
-            if isinstance(func, Function):
-                local_vars = dict(self.variables)
-                local_vars[func.arg_name] = arg_value
-                local_evaluator = Evaluator(local_vars)
-                return local_evaluator.evaluate(func.body_ast)
-
-            # If it's a python callable (builtin), call it with the evaluated argument
-            if callable(func):
-                return func(arg_value)
-
-            raise TypeError(f"'{func_name}' is not callable")
-        
-        else:
-            raise ValueError(f"Unknown node type: {node_type}")
+            value = self.apply_binop(op, left, right)
+        self._store_constant(ast, value)
+        return value
+
+    def _gather_matmul_operands(self, ast, operands):
+        """Flatten a tree of '**' nodes into a list of evaluated operands."""
+        for child in (ast[2], ast[3]):
+            if child is not None and child[0] == 'binop' and child[1] in ('**', 'MATMUL'):
+                self._gather_matmul_operands(child, operands)
+            else:
+                operands.append(self.evaluate(child))
+
+    @staticmethod
+    def _matmul_chain(mats):
+        """Multiply a chain of matrices in the cheapest association order.
+
+        Uses the classic matrix-chain-order dynamic program (O(n^3) in the
+        chain length) to minimize scalar multiplications; the result is the
+        same for any association. Falls back to a single matmul for chains
+        of two.
+        """
+        for m in mats:
+            if not isinstance(m, Matrix):
+                raise TypeError("Matrix multiplication '**' requires two matrices")
+        for a, b in zip(mats, mats[1:]):
+            if a.cols != b.rows:
+                raise ValueError("Matrix dimensions incompatible for multiplication")
+        n = len(mats)
+        if n == 1:
+            return mats[0]
+        if n == 2:
+            return mats[0].matmul(mats[1])
+
+        # dims[i] x dims[i+1] is the shape of mats[i]
+        dims = [mats[0].rows] + [m.cols for m in mats]
+        cost = [[0] * n for _ in range(n)]
+        split = [[0] * n for _ in range(n)]
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                j = i + length - 1
+                best = None
+                for k in range(i, j):
+                    c = (cost[i][k] + cost[k + 1][j] +
+                         dims[i] * dims[k + 1] * dims[j + 1])
+                    if best is None or c < best:
+                        best = c
+                        split[i][j] = k
+                cost[i][j] = best
+
+        def multiply(i, j):
+            if i == j:
+                return mats[i]
+            k = split[i][j]
+            return multiply(i, k).matmul(multiply(k + 1, j))
+
+        return multiply(0, n - 1)
+
+    def _eval_unary(self, ast):
+        cached = self._constant_value(ast)
+        if cached is not None:
+            return cached
+        op = ast[1]
+        operand = self.evaluate(ast[2])
+        if op == '-':
+            value = -operand
+            self._store_constant(ast, value)
+            return value
+        raise ValueError(f"Unknown unary operator: {op}")
+
+    def _eval_call(self, ast):
+        # Function call: ('call', name, arg_ast)
+        func_name = ast[1]
+        arg_ast = ast[2]
+        arg_value = self.evaluate(arg_ast)
+        func = self.get_variable(func_name)
+        if func is None:
+            raise NameError(f"Function '{func_name}' is not defined")
+        # If it's a user-defined Function, evaluate its AST in a local evaluator
+        if isinstance(func, Function):
+            # Lower purely arithmetic bodies to a compiled closure once per
+            # Function; such bodies see no free variables, so no scope push
+            # is needed. Everything else compiles to a flat postfix program:
+            # the iterative evaluator skips one Python frame per operator node.
+            compiled = getattr(func, '_compiled_body', False)
+            if compiled is False:
+                compiled = func._compiled_body = self.compile_closure(
+                    func.body_ast, func.arg_name)
+            # Memoize calls on hashable (scalar) arguments. The key carries
+            # the environment version so reassigning any variable the body
+            # may reference invalidates previous entries. Bodies with free
+            # variables are cached only when evaluated at root scope: inside
+            # another call the caller's pushed bindings can shadow the names
+            # the body reads, and a result computed under a shadow must not
+            # be served at top level. Compiled closures depend on nothing
+            # but the argument, so they cache under any scope.
+            cache_key = self._call_cache_key(arg_value)
+            if (cache_key is not None and compiled is None
+                    and type(self.variables) is not dict):
+                cache_key = None
+            if cache_key is not None:
+                cache = getattr(func, '_call_cache', None)
+                if cache is None:
+                    cache = func._call_cache = {}
+                full_key = (cache_key, self._env_version)
+                if full_key in cache:
+                    return cache[full_key]
+            # Push a one-entry scope over the caller's variables instead of
+            # copying the environment or building a whole new Evaluator
+            # (whose __init__ rebuilds the builtin and dispatch tables):
+            # O(1) per call regardless of how many variables are defined.
+            if compiled is not None:
+                result = compiled(arg_value)
+            else:
+                program = getattr(func, '_rpn_program', None)
+                if program is None:
+                    program = func._rpn_program = self.compile_rpn(func.body_ast)
+                prev_vars = self.variables
+                self.variables = ChainMap({func.arg_name: arg_value}, prev_vars)
+                try:
+                    result = self.evaluate_rpn(program)
+                finally:
+                    self.variables = prev_vars
+            if cache_key is not None:
+                if len(cache) >= self.CALL_CACHE_SIZE:
+                    cache.clear()
+                cache[(cache_key, self._env_version)] = result
+            return result
+
+        # If it's a python callable (builtin), call it with the evaluated argument
+        if callable(func):
+            return func(arg_value)
+
+        raise TypeError(f"'{func_name}' is not callable")
     
     def apply_binop(self, op: str, left, right):
         """Apply binary operation."""
-        if op == '+':
-            return left + right
-        elif op == '-':
-            return left - right
-        elif op == '*':
-            # Matrix * Matrix has two semantics:
-            # - If both have identical dimensions: element-wise multiplication (previous behavior)
-            # - If dimensions are compatible for matrix multiplication (cols of left == rows of right)
-            #   and at least one operand is vector-shaped (1xN or Nx1), treat '*' as matmul convenience
-            if isinstance(left, Matrix) and isinstance(right, Matrix):
-                # exact same dims -> element-wise
-                if left.rows == right.rows and left.cols == right.cols:
-                    result = []
-                    for i in range(left.rows):
-                        row = []
-                        for j in range(left.cols):
-                            row.append(left.data[i][j] * right.data[i][j])
-                        result.append(row)
-                    return Matrix(result)
-
-                # if shapes are compatible for matrix multiplication, and one is vector-shaped,
-                # do matrix multiplication as a convenience for matrix-vector operations
-                if left.cols == right.rows and (left.is_vector() or right.is_vector()):
-                    return left.matmul(right)
-
-                raise ValueError("Matrix dimensions incompatible for '*' operation")
-
-            return left * right
-        elif op == '/':
-            return left / right
-        elif op == '%':
-            # Modulo operator: only supported for rationals (or ints/floats)
-            # Complex modulo is not defined here.
-            if isinstance(left, Rational) and isinstance(right, Rational):
-                return left % right
-            elif isinstance(left, (int, float)) and isinstance(right, (int, float)):
-                return Rational(left % right)
-            else:
-                raise TypeError("Modulo operator supported only for rational/integer operands")
-        elif op == '**' or op == 'MATMUL':
-            # Matrix multiplication operator '**'
-            if isinstance(left, Matrix) and isinstance(right, Matrix):
+        handler = self._binop_handlers.get(op)
+        if handler is None:
+            raise ValueError(f"Unknown operator: {op}")
+        return handler(left, right)
+
+    # --- per-operator handlers ---
+    # '+', '-' and '/' need no wrapper: operator.add/sub/truediv go straight
+    # into the table above.
+    def _op_mul(self, left, right):
+        # Matrix * Matrix has two semantics:
+        # - If both have identical dimensions: element-wise multiplication (previous behavior)
+        # - If dimensions are compatible for matrix multiplication (cols of left == rows of right)
+        #   and at least one operand is vector-shaped (1xN or Nx1), treat '*' as matmul convenience
+        if isinstance(left, Matrix) and isinstance(right, Matrix):
+            # exact same dims -> element-wise
+            if left.rows == right.rows and left.cols == right.cols:
+                # Single comprehension over paired rows: avoids per-cell
+                # index arithmetic and list.append dispatch in the hot loop
+                # while keeping exact Rational arithmetic.
+                result = [
+                    [a * b for a, b in zip(lrow, rrow)]
+                    for lrow, rrow in zip(left.data, right.data)
+                ]
+                return Matrix(result)
+
+            # if shapes are compatible for matrix multiplication, and one is vector-shaped,
+            # do matrix multiplication as a convenience for matrix-vector operations
+            if left.cols == right.rows and (left.is_vector() or right.is_vector()):
                 return left.matmul(right)
-            # Allow scalar * matrix with matmul as well? disallow to avoid ambiguity
-            raise TypeError("Matrix multiplication '**' requires two matrices")
-        elif op == '^':
-            # Handle power operation
-            # Rational power
-            if isinstance(left, Rational) and isinstance(right, Rational):
-                return left ** right
-            # Matrix power: integer non-negative exponent
-            if isinstance(left, Matrix):
-                # Right must be Rational with integer >= 0
-                if isinstance(right, Rational) and right.value.denominator == 1:
-                    n = int(right.value)
-                    if n == 0:
-                        if left.rows != left.cols:
-                            raise ValueError("Matrix power requires a square matrix")
-                        # identity
-                        I = []
-                        for i in range(left.rows):
-                            row = []
-                            for j in range(left.cols):
-                                row.append(Rational(1) if i == j else Rational(0))
-                            I.append(row)
-                        return Matrix(I)
-                    if n > 0:
-                        if left.rows != left.cols:
-                            raise ValueError("Matrix power requires a square matrix")
-                        result = left
-                        for _ in range(n - 1):
-                            result = result.matmul(left)
-                        return result
-                    # negative integer exponent: compute inverse then positive power
-                    if n < 0:
-                        if left.rows != left.cols:
-                            raise ValueError("Matrix power requires a square matrix")
-                        inv = left.inverse()
-                        k = -n
-                        if k == 1:
-                            return inv
-                        result = inv
-                        for _ in range(k - 1):
-                            result = result.matmul(inv)
-                        return result
-                else:
-                    raise TypeError("Matrix exponent must be an integer")
-            if isinstance(left, Complex):
-                # Complex power is not implemented for simplicity
-                raise TypeError("Complex power operation not supported")
+
+            raise ValueError("Matrix dimensions incompatible for '*' operation")
+
+        return left * right
+
+    def _op_mod(self, left, right):
+        # Modulo operator: only supported for rationals (or ints/floats)
+        # Complex modulo is not defined here.
+        if isinstance(left, Rational) and isinstance(right, Rational):
+            return left % right
+        elif isinstance(left, (int, float)) and isinstance(right, (int, float)):
+            return Rational(left % right)
+        else:
+            raise TypeError("Modulo operator supported only for rational/integer operands")
+
+    def _op_matmul(self, left, right):
+        # Matrix multiplication operator '**'
+        if isinstance(left, Matrix) and isinstance(right, Matrix):
+            return left.matmul(right)
+        # Allow scalar * matrix with matmul as well? disallow to avoid ambiguity
+        raise TypeError("Matrix multiplication '**' requires two matrices")
+
+    def _op_pow(self, left, right):
+        # Handle power operation
+        # Rational power
+        if isinstance(left, Rational) and isinstance(right, Rational):
+            # Integer exponents are the overwhelmingly common case: build
+            # the result directly from integer powers of the (already
+            # coprime) numerator/denominator instead of going through the
+            # general Fraction.__pow__ path.
+            if right.value.denominator == 1:
+                n = right.value.numerator
+                num = left.value.numerator
+                den = left.value.denominator
+                if n >= 0:
+                    return Rational(Fraction(num ** n, den ** n))
+                return Rational(Fraction(den ** -n, num ** -n))
+            return left ** right
+        # Matrix power: integer non-negative exponent
+        if isinstance(left, Matrix):
+            # Right must be Rational with integer >= 0
+            if isinstance(right, Rational) and right.value.denominator == 1:
+                n = int(right.value)
+                if left.rows != left.cols:
+                    raise ValueError("Matrix power requires a square matrix")
+                if n == 1:
+                    return left
+                if n == 0:
+                    return Matrix.identity(left.rows)
+                if n > 0:
+                    return self._matrix_pow(left, n)
+                # negative integer exponent: compute inverse then positive power
+                return self._matrix_pow(left.inverse(), -n)
             else:
-                raise TypeError(f"Cannot apply power to {type(left)} and {type(right)}")
+                raise TypeError("Matrix exponent must be an integer")
+        if isinstance(left, Complex):
+            # Complex power is not implemented for simplicity
+            raise TypeError("Complex power operation not supported")
         else:
-            raise ValueError(f"Unknown operator: {op}")
+            raise TypeError(f"Cannot apply power to {type(left)} and {type(right)}")
     
+    def _is_constant_ast(self, ast) -> bool:
+        """Return True if the AST subtree contains no variables or calls.
+
+        Matrix literals are excluded (their row lists make the node
+        unhashable and Matrix values are not safe to share).
+        """
+        if ast is None:
+            return True
+        node_type = ast[0]
+        if node_type in ('number', 'imaginary'):
+            return True
+        if node_type in ('variable', 'call', 'matrix'):
+            return False
+        flag = self._const_flags.get(ast)
+        if flag is None:
+            if node_type == 'unary':
+                flag = self._is_constant_ast(ast[2])
+            elif node_type == 'binop':
+                flag = (self._is_constant_ast(ast[2]) and
+                        self._is_constant_ast(ast[3]))
+            else:
+                flag = False
+            if len(self._const_flags) < self.CONST_CACHE_SIZE:
+                try:
+                    self._const_flags[ast] = flag
+                except TypeError:
+                    # unhashable subtree (contains a matrix literal): skip memo
+                    pass
+        return flag
+
+    def _constant_value(self, ast):
+        """Return the cached value of a constant subtree, or None."""
+        try:
+            if self._is_constant_ast(ast):
+                return self._const_values.get(ast)
+        except TypeError:
+            pass
+        return None
+
+    def _store_constant(self, ast, value):
+        """Cache the value of a subtree if it is constant (and hashable)."""
+        if len(self._const_values) >= self.CONST_CACHE_SIZE:
+            return
+        try:
+            if self._is_constant_ast(ast):
+                self._const_values[ast] = value
+        except TypeError:
+            pass
+
+    @staticmethod
+    def _call_cache_key(arg_value):
+        """Return a hashable cache key for a function argument, or None.
+
+        Rational and Complex values map to their exact Fraction components;
+        matrices and anything else are not cached (None disables caching).
+        """
+        if isinstance(arg_value, Rational):
+            return arg_value.value
+        if isinstance(arg_value, Complex):
+            return (arg_value.real.value, arg_value.imag.value)
+        return None
+
+    @staticmethod
+    def _matrix_pow(base: Matrix, n: int) -> Matrix:
+        """Raise a square matrix to a positive integer power.
+
+        Uses binary exponentiation (exponentiation by squaring): O(log n)
+        matrix multiplications instead of n-1.
+        """
+        result = None
+        while n:
+            if n & 1:
+                result = base if result is None else result.matmul(base)
+            n >>= 1
+            if n:
+                base = base.matmul(base)
+        return result
+
     def assign(self, var_name: str, value):
         """Assign a value to a variable (case-insensitive)."""
         if var_name.lower() == 'i':
             raise NameError("'i' is reserved for the imaginary unit and cannot be used as a variable name")
         self.variables[var_name.lower()] = value
+        self._env_version += 1
     
     def get_variable(self, var_name: str):
-        """Get a variable value."""
-        key = var_name.lower()
-        if key in self.variables:
-            return self.variables.get(key)
+        """Get a variable value.
+
+        Expects an already-lowercased name: the parser normalizes
+        identifiers, so the hot path is two plain dict gets.
+        """
+        val = self.variables.get(var_name)
+        if val is not None:
+            return val
         # fall back to builtins
-        return self.builtins.get(key)
+        return self.builtins.get(var_name)
 
     # --- builtin implementations ---
     def _to_python_complex(self, v):
         """Convert Rational/Complex/int/float to a python complex number."""
-        if isinstance(v, Complex):
-            return complex(float(v.real.value), float(v.imag.value))
-        if isinstance(v, Rational):
-            return complex(float(v.value), 0.0)
-        if isinstance(v, (int, float)):
-            return complex(float(v), 0.0)
+        conv = _TO_COMPLEX.get(type(v))
+        if conv is not None:
+            return conv(v)
         raise TypeError(f"Cannot convert {type(v)} to numeric for builtin")
 
     def set_angle_mode(self, mode: str):
@@ -247,39 +630,58 @@ class Evaluator:
             self.angle_mode = 'degrees'
         else:
             raise ValueError("Unknown angle mode: choose 'radians' or 'degrees'")
+        # The mode changes what trig builtins return, so every
+        # version-keyed cache (line results, call memos, body renders)
+        # must treat it like an environment change.
+        self._env_version += 1
 
     def _from_python_number(self, z):
         """Convert a python real/complex number to Rational or Complex where appropriate."""
-        from types_system import Rational, Complex
+        cache = _RATIONAL_CACHE
         if isinstance(z, complex):
-            real = Rational(float(z.real))
-            imag = Rational(float(z.imag))
-            if imag.value == 0:
+            real = cache.get(z.real) or Rational(float(z.real))
+            if z.imag == 0.0:
                 return real
+            imag = cache.get(z.imag) or Rational(float(z.imag))
             return Complex(real, imag)
         # real
-        return Rational(float(z))
+        return cache.get(z) or Rational(float(z))
+
+    def _real_trig_arg(self, arg):
+        """Return arg as a float (angle-mode adjusted) if it is purely real,
+        else None. Lets trig builtins take the cheap math.* path without
+        complex allocations for the common real case."""
+        if isinstance(arg, Rational):
+            x = float(arg.value)
+        elif isinstance(arg, (int, float)):
+            x = float(arg)
+        elif isinstance(arg, Complex) and arg.imag.value == 0:
+            x = float(arg.real.value)
+        else:
+            return None
+        if self.angle_mode == 'degrees':
+            x = math.radians(x)
+        return x
 
     def _builtin_sin(self, arg):
-        z = self._to_python_complex(arg)
-        # If angle mode is degrees and z is purely real, convert degrees -> radians
-        if self.angle_mode == 'degrees' and z.imag == 0:
-            z = complex(math.radians(z.real), 0.0)
-        res = cmath.sin(z)
+        x = self._real_trig_arg(arg)
+        if x is not None:
+            return self._from_python_number(math.sin(x))
+        res = cmath.sin(self._to_python_complex(arg))
         return self._from_python_number(res)
 
     def _builtin_cos(self, arg):
-        z = self._to_python_complex(arg)
-        if self.angle_mode == 'degrees' and z.imag == 0:
-            z = complex(math.radians(z.real), 0.0)
-        res = cmath.cos(z)
+        x = self._real_trig_arg(arg)
+        if x is not None:
+            return self._from_python_number(math.cos(x))
+        res = cmath.cos(self._to_python_complex(arg))
         return self._from_python_number(res)
 
     def _builtin_tan(self, arg):
-        z = self._to_python_complex(arg)
-        if self.angle_mode == 'degrees' and z.imag == 0:
-            z = complex(math.radians(z.real), 0.0)
-        res = cmath.tan(z)
+        x = self._real_trig_arg(arg)
+        if x is not None:
+            return self._from_python_number(math.tan(x))
+        res = cmath.tan(self._to_python_complex(arg))
         return self._from_python_number(res)
 
     def _builtin_exp(self, arg):
@@ -308,20 +710,19 @@ class Evaluator:
         - scalar (Rational/Complex/int/float): magnitude (same as abs)
         - Matrix: Frobenius norm (sqrt of sum of squared magnitudes of entries)
         """
-        from types_system import Matrix
         # scalar-like: delegate to abs
         if isinstance(arg, (int, float, Rational, Complex)):
             return self._builtin_abs(arg)
         if isinstance(arg, Matrix):
-            # sum squares of absolute values of each entry
-            total = 0+0j
-            for i in range(arg.rows):
-                for j in range(arg.cols):
-                    entry = arg.data[i][j]
-                    z = self._to_python_complex(entry)
-                    total += (z.real * z.real + z.imag * z.imag)
-            # total is real non-negative
-            res = math.sqrt(total.real)
+            # sum squares of each entry; Matrix cells are always Rational,
+            # so convert straight to float without the per-entry
+            # _to_python_complex call and complex accumulator
+            total = 0.0
+            for row in arg.data:
+                for entry in row:
+                    f = float(entry.value)
+                    total += f * f
+            res = math.sqrt(total)
             return self._from_python_number(res)
         # If it's a 1-D matrix (vector-like) it will still be handled above as Matrix
         raise TypeError(f"norm() not supported for type {type(arg)}")
@@ -333,7 +734,6 @@ class Evaluator:
         For Complex returns reciprocal as Complex.
         For Matrix returns exact inverse (Matrix.inverse) or raises if not invertible.
         """
-        from types_system import Matrix, Rational, Complex
         if isinstance(arg, Matrix):
             return arg.inverse()
         if isinstance(arg, Rational):
@@ -3,258 +3,470 @@ Main interpreter module
 Coordinates parsing, evaluation, and solving
 """
 
+import sys
+from collections import OrderedDict
+from fractions import Fraction
+
 from parser import Lexer, Parser
+from ast_opt import simplify_statement
 from evaluator import Evaluator
 from solver import EquationSolver
-from types_system import Rational, Complex, Matrix
+from types_system import Rational, Complex, Matrix, Function
+
+# Node-type tags interned once so the remaining == comparisons against AST
+# tags resolve by identity on the fast path (the parser builds its tuples
+# from identical literals, which CPython interns the same way).
+_NT_NUMBER = sys.intern('number')
+_NT_VARIABLE = sys.intern('variable')
+_NT_IMAGINARY = sys.intern('imaginary')
+_NT_MATRIX = sys.intern('matrix')
+_NT_UNARY = sys.intern('unary')
+_NT_BINOP = sys.intern('binop')
+_NT_CALL = sys.intern('call')
+_NT_ASSIGN = sys.intern('assign')
+_NT_FUN_ASSIGN = sys.intern('fun_assign')
+_NT_EQUATION = sys.intern('equation')
+
+# Sentinel returned by command handlers that decline the line so execute
+# falls through to the expression parser (None is a valid command result).
+_FALLTHROUGH = object()
+
+# Operator precedence for parenthesization while rendering ASTs back to
+# strings; unknown operators fall back to 0 via _PREC.get(op, 0).
+_PREC = {'^': 4, '*': 3, '/': 3, '%': 3, '+': 2, '-': 2}
 
 
 class Interpreter:
     """Main interpreter for computor v2."""
-    
+
+    # Bound on the line -> AST parse cache below
+    PARSE_CACHE_SIZE = 1024
+    # Bound on the rendered-function-body cache below
+    BODY_RENDER_CACHE_SIZE = 256
+    # Bound on the whole-line result cache below
+    RESULT_CACHE_SIZE = 1024
+    # Bound on the argument-spine cache below
+    ARG_PATHS_CACHE_SIZE = 256
+
     def __init__(self):
         self.evaluator = Evaluator()
         self.solver = EquationSolver(self.evaluator)
-    
+        # Parsed-AST cache keyed by the input line: REPL sessions re-run the
+        # same commands (arrow-up recall), and parsing is deterministic, so
+        # repeats skip the lexer and parser entirely. LRU: hits are moved to
+        # the back, and the oldest entry is dropped when the cap is reached.
+        self._parse_cache = OrderedDict()
+        # Whole-line result cache keyed by (line, environment version); see
+        # execute. LRU-bounded like the parse cache.
+        self._result_cache = OrderedDict()
+
+        # Node-type -> handler tables for the AST walkers below. A single
+        # dict probe replaces the string-compare cascade each walker used to
+        # run per node (same pattern as Evaluator._eval_handlers). Leaf
+        # types are omitted where the walker's fallback already handles them.
+        self._to_string_handlers = {
+            'number': self._str_leaf,
+            'variable': self._str_leaf,
+            'imaginary': self._str_imaginary,
+            'matrix': self._str_matrix,
+        }
+        self._has_vars_handlers = {
+            'variable': self._hv_variable,
+            'matrix': self._hv_matrix,
+            'unary': self._hv_unary,
+            'binop': self._hv_binop,
+            'call': self._hv_call,
+        }
+        self._inline_handlers = {
+            'call': self._inline_call,
+            'binop': self._inline_binop,
+            'unary': self._inline_unary,
+            'matrix': self._inline_matrix,
+        }
+        self._subst_handlers = {
+            'variable': self._subst_variable,
+            'unary': self._subst_unary,
+            'binop': self._subst_binop,
+            'call': self._subst_call,
+            'matrix': self._subst_matrix,
+        }
+
+        # (id(body_ast), arg_name, env version) -> rendered body string.
+        # Re-defining or re-displaying a function re-renders nothing unless
+        # a variable assignment has bumped the evaluator's version counter.
+        # Values pin the body AST so the id key cannot be recycled.
+        self._body_render_cache = OrderedDict()
+
+        # (id(body_ast), arg_name) -> (body_ast, set of ids of body
+        # subtrees that contain the argument). Computed once per function
+        # body, lets repeated inlining skip whole argument-free subtrees
+        # without walking them (see _inline_call / _substitute_spine).
+        # LRU-bounded: each entry pins its body AST, so unbounded growth
+        # would leak every superseded body across redefinitions.
+        self._arg_paths_cache = OrderedDict()
+
+        # Concrete type -> formatter for format_value_for_display; anything
+        # not in the table (Matrix, Function, ...) falls back to str.
+        self._display_formatters = {
+            Rational: self._fmt_rational,
+            Complex: str,
+            int: str,
+            float: str,
+        }
+
+        # First-token -> special-command handler; one dict probe replaces
+        # the chain of lower()/startswith scans execute used to run per line.
+        self._cmd_handlers = {
+            'vars': self._cmd_vars,
+            'display': self._cmd_vars,
+            'show': self._cmd_vars,
+            'angles': self._cmd_angles,
+            'plot': self._cmd_plot,
+        }
+
+        # Statement-node -> handler; bare expressions fall through to
+        # _handle_expression in execute.
+        self._stmt_handlers = {
+            _NT_ASSIGN: self._handle_assign,
+            _NT_FUN_ASSIGN: self._handle_fun_assign,
+            _NT_EQUATION: self._handle_equation,
+        }
+
     def execute(self, line: str):
         """Execute a line of input."""
         line = line.strip()
-        
+
         if not line:
             return None
+
+        # Special commands: dispatch on the first token, lowercasing just
+        # that token rather than rescanning/copying the whole line
+        first, _, _rest = line.partition(' ')
+        handler = self._cmd_handlers.get(first.lower())
+        if handler is not None:
+            result = handler(line)
+            if result is not _FALLTHROUGH:
+                return result
+
+        # Whole-line result cache: repeated identical input (test suites,
+        # re-run queries) skips parsing, evaluation and solving outright.
+        # The key carries the environment version, which every assignment
+        # bumps, so statements with side effects never hit a stale entry —
+        # their own execution moves them to a fresh key.
+        result_key = (line, self.evaluator._env_version)
+        cached = self._result_cache.get(result_key)
+        if cached is not None:
+            self._result_cache.move_to_end(result_key)
+            return cached
+
+        ast = self._parse_cache.get(line)
+        if ast is not None:
+            self._parse_cache.move_to_end(line)
+        else:
+            # Tokenize
+            try:
+                lexer = Lexer(line)
+                tokens = lexer.tokenize()
+            except SyntaxError as e:
+                raise SyntaxError(f"Syntax error: {e}")
+
+            # Parse
+            try:
+                parser = Parser(tokens,
+                                maybe_equation=lexer.has_equals and lexer.has_question)
+                ast = parser.parse()
+            except SyntaxError as e:
+                raise SyntaxError(f"Parse error: {e}")
+
+            if ast is None:
+                return None
+
+            # Fold constants and strip trivial identities once, up front;
+            # every later evaluation (and each call of a function defined
+            # on this line) walks the smaller tree.
+            ast = simplify_statement(ast)
+
+            if len(self._parse_cache) >= self.PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+            self._parse_cache[line] = ast
         
-        # Special commands
-        if line.lower() == 'vars':
-            return self.list_variables()
-
-        # Aliases for listing variables
-        if line.lower() in ('display', 'show'):
-            return self.list_variables()
-
-        # Angle mode command: 'angles' to show mode, or 'angles rad' / 'angles deg' to set
-        if line.lower().startswith('angles'):
-            parts = line.split()
-            if len(parts) == 1:
-                # show current mode
-                return f"angle mode: {self.evaluator.angle_mode}"
-            elif len(parts) == 2:
-                mode = parts[1]
-                try:
-                    self.evaluator.set_angle_mode(mode)
-                    return f"angle mode set to {self.evaluator.angle_mode}"
-                except Exception as e:
-                    raise SyntaxError(str(e))
-            else:
-                raise SyntaxError("Usage: angles [rad|deg]")
-
-        # Plot command: plot <func> <start> <end> [points]
-        if line.lower().startswith('plot '):
-            parts = line.split()
-            if len(parts) < 4:
-                raise SyntaxError("Usage: plot <function> <start> <end> [points]")
-            func_name = parts[1]
+        # Execute based on AST type: one dict probe, falling back to plain
+        # expression evaluation for anything that is not a statement
+        handler = self._stmt_handlers.get(ast[0])
+        if handler is None:
+            result = self._handle_expression(ast)
+        else:
+            result = handler(ast)
+        if isinstance(result, str):
+            if len(self._result_cache) >= self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+            self._result_cache[result_key] = result
+        return result
+
+    # --- statement handlers (dispatched from execute) ---
+    def _handle_assign(self, ast):
+        # Variable assignment
+        var_name = ast[1]
+        expr_ast = ast[2]
+        value = self.evaluator.evaluate(expr_ast)
+        self.evaluator.assign(var_name, value)
+        # Return the assigned value so the REPL can echo it (and allow type changes by inference)
+        return self.format_result(value)
+
+    def _handle_fun_assign(self, ast):
+        # Function assignment: store the argument name and body AST
+        func_name = ast[1]
+        arg_name = ast[2]
+        body_ast = ast[3]
+        func = Function(arg_name, body_ast, name=func_name)
+        self.evaluator.assign(func_name, func)
+        # Return a pretty-printed version of the function body with
+        # any non-argument variables folded to their current values.
+        return self.render_function_body(body_ast, arg_name)
+
+    def _handle_equation(self, ast):
+        # Solve equation
+        left_ast = ast[1]
+        right_ast = ast[2]
+        # If right_ast is None, it's an evaluation request like 'expr = ?'
+        if right_ast is None:
+            # Try to inline user-defined function calls symbolically so expressions
+            # like funA(funB(x)) = ? produce a composed expression rather than
+            # attempting to numerically evaluate the free variable 'x'.
             try:
-                start = float(parts[2])
-                end = float(parts[3])
-            except ValueError:
-                raise SyntaxError("Start and end must be numeric")
-            points = 200
-            if len(parts) >= 5:
-                try:
-                    points = int(parts[4])
-                except ValueError:
-                    raise SyntaxError("points must be an integer")
-
-            # Lookup the function object
-            func_obj = self.evaluator.get_variable(func_name)
-            if func_obj is None:
-                raise NameError(f"Function '{func_name}' is not defined")
-            from types_system import Function
-            if not isinstance(func_obj, Function):
-                raise TypeError(f"'{func_name}' is not a function")
-
-            # Lazy import of plotting helper
+                inlined = self.inline_function_calls(left_ast)
+                # If the inlined AST still contains variables, render it structurally
+                if self.ast_has_variables(inlined):
+                    return self.ast_to_string(inlined)
+                # Otherwise evaluate normally
+                val = self.evaluator.evaluate(inlined)
+                return self.format_result(val)
+            except Exception:
+                # Fallback to numeric evaluation (will raise if variables are missing)
+                val = self.evaluator.evaluate(left_ast)
+                return self.format_result(val)
+        return self.solver.solve(left_ast, right_ast)
+
+    def _handle_expression(self, ast):
+        # Evaluate expression
+        result = self.evaluator.evaluate(ast)
+        return self.format_result(result)
+
+    # --- special-command handlers (dispatched from execute) ---
+    def _cmd_vars(self, line):
+        """List variables; 'vars'/'display'/'show' must be the whole line."""
+        if ' ' in line:
+            return _FALLTHROUGH
+        return self.list_variables()
+
+    def _cmd_angles(self, line):
+        """'angles' to show mode, 'angles rad' / 'angles deg' to set."""
+        parts = line.split()
+        if len(parts) == 1:
+            # show current mode
+            return f"angle mode: {self.evaluator.angle_mode}"
+        elif len(parts) == 2:
+            mode = parts[1]
             try:
-                from plotter import plot_function
+                self.evaluator.set_angle_mode(mode)
+                return f"angle mode set to {self.evaluator.angle_mode}"
             except Exception as e:
-                raise RuntimeError(f"Plotting helper unavailable: {e}")
-
-            return plot_function(self.evaluator, func_obj, start, end, points)
-        
-        # Tokenize
+                raise SyntaxError(str(e))
+        else:
+            raise SyntaxError("Usage: angles [rad|deg]")
+
+    def _cmd_plot(self, line):
+        """Plot command: plot <func> <start> <end> [points]."""
+        parts = line.split()
+        if len(parts) == 1:
+            # bare 'plot' is an ordinary identifier, not the command
+            return _FALLTHROUGH
+        if len(parts) < 4:
+            raise SyntaxError("Usage: plot <function> <start> <end> [points]")
+        func_name = parts[1]
         try:
-            lexer = Lexer(line)
-            tokens = lexer.tokenize()
-        except SyntaxError as e:
-            raise SyntaxError(f"Syntax error: {e}")
-        
-        # Parse
+            start = float(parts[2])
+            end = float(parts[3])
+        except ValueError:
+            raise SyntaxError("Start and end must be numeric")
+        points = 200
+        if len(parts) >= 5:
+            try:
+                points = int(parts[4])
+            except ValueError:
+                raise SyntaxError("points must be an integer")
+
+        # Lookup the function object (names are stored lowercase)
+        func_obj = self.evaluator.get_variable(func_name.lower())
+        if func_obj is None:
+            raise NameError(f"Function '{func_name}' is not defined")
+        if not isinstance(func_obj, Function):
+            raise TypeError(f"'{func_name}' is not a function")
+
+        # Lazy import of plotting helper
         try:
-            parser = Parser(tokens)
-            ast = parser.parse()
-        except SyntaxError as e:
-            raise SyntaxError(f"Parse error: {e}")
-        
-        if ast is None:
-            return None
-        
-        # Execute based on AST type
-        node_type = ast[0]
-        
-        if node_type == 'assign':
-            # Variable assignment
-            var_name = ast[1]
-            expr_ast = ast[2]
-            value = self.evaluator.evaluate(expr_ast)
-            self.evaluator.assign(var_name, value)
-            # Return the assigned value so the REPL can echo it (and allow type changes by inference)
-            return self.format_result(value)
-
-        elif node_type == 'fun_assign':
-            # Function assignment: store the argument name and body AST
-            func_name = ast[1]
-            arg_name = ast[2]
-            body_ast = ast[3]
-            # Lazy container; evaluator will store it as-is
-            from types_system import Function
-            func = Function(arg_name, body_ast, name=func_name)
-            self.evaluator.assign(func_name, func)
-            # Return a pretty-printed version of the function body with
-            # any non-argument variables folded to their current values.
-            return self.render_function_body(body_ast, arg_name)
-        
-        elif node_type == 'equation':
-            # Solve equation
-            left_ast = ast[1]
-            right_ast = ast[2]
-            # If right_ast is None, it's an evaluation request like 'expr = ?'
-            if right_ast is None:
-                # Try to inline user-defined function calls symbolically so expressions
-                # like funA(funB(x)) = ? produce a composed expression rather than
-                # attempting to numerically evaluate the free variable 'x'.
-                try:
-                    inlined = self.inline_function_calls(left_ast)
-                    # If the inlined AST still contains variables, render it structurally
-                    if self.ast_has_variables(inlined):
-                        return self.ast_to_string(inlined)
-                    # Otherwise evaluate normally
-                    val = self.evaluator.evaluate(inlined)
-                    return self.format_result(val)
-                except Exception:
-                    # Fallback to numeric evaluation (will raise if variables are missing)
-                    val = self.evaluator.evaluate(left_ast)
-                    return self.format_result(val)
-            return self.solver.solve(left_ast, right_ast)
-        
-        else:
-            # Evaluate expression
-            result = self.evaluator.evaluate(ast)
-            return self.format_result(result)
-    
+            from plotter import plot_function
+        except Exception as e:
+            raise RuntimeError(f"Plotting helper unavailable: {e}")
+
+        return plot_function(self.evaluator, func_obj, start, end, points)
+
     def format_result(self, value):
-        """Format a value for output."""
-        if isinstance(value, (Rational, Complex, Matrix)):
-            return str(value)
-        # Functions
-        from types_system import Function
+        """Format a value for output.
+
+        Values are immutable once stored, so the rendered string is cached
+        on the object itself: re-listing variables (vars/display/show)
+        re-formats large matrices and function bodies for free.
+        """
+        cached = getattr(value, '_repr_cache', None)
+        if cached is not None:
+            return cached
         if isinstance(value, Function):
             # Show function body (using argument name in representation)
-            return self.ast_to_string(value.body_ast)
-        elif isinstance(value, (int, float)):
-            # Print native floats/ints directly (builtins often return floats)
-            return str(value)
+            result = self.ast_to_string(value.body_ast)
         else:
-            return str(value)
+            # Rational/Complex/Matrix render via __str__; native ints and
+            # floats (builtins often return floats) print directly too
+            result = str(value)
+        try:
+            value._repr_cache = result
+        except (AttributeError, TypeError):
+            # int/float and other attribute-less values: skip caching
+            pass
+        return result
 
     def ast_to_string(self, ast):
-        """Convert an AST back to a readable expression string."""
+        """Convert an AST back to a readable expression string.
+
+        binop/unary spines — the only node kinds that nest arbitrarily
+        deep — are walked iteratively in postorder over an explicit work
+        stack, so rendering never recurses per operator node and long
+        a+b+c+... chains cannot hit the interpreter recursion limit.
+        Child strings are kept in a dict keyed by node id (shared subtrees
+        render once for free).
+        """
         if ast is None:
             return ""
-
-        node_type = ast[0]
-
-        if node_type == 'number':
-            return ast[1]
-
-        if node_type == 'variable':
-            return ast[1]
-
-        if node_type == 'imaginary':
-            return 'i'
-
-        if node_type == 'matrix':
-            # Reconstruct matrix literal
-            rows = []
-            for row_ast in ast[1]:
-                row_elems = [self.ast_to_string(elem) for elem in row_ast]
-                rows.append('[ ' + ' , '.join(row_elems) + ' ]')
-            return '[ ' + ' ; '.join(rows) + ' ]'
-
-        if node_type == 'unary':
-            op = ast[1]
-            operand_ast = ast[2]
-            operand = self.ast_to_string(operand_ast)
-            # Parenthesize operand if it's a binary operation for clarity: - (x + 2)
-            if operand_ast and operand_ast[0] == 'binop':
-                return f"{op}({operand})"
-            return f"{op}{operand}"
-
-        if node_type == 'binop':
-            op = ast[1]
-            left_ast = ast[2]
-            right_ast = ast[3]
-
-            def prec(a):
-                if a == '^':
-                    return 4
-                if a in ('*', '/', '%'):
-                    return 3
-                if a in ('+', '-'):
-                    return 2
-                return 0
-
-            left = self.ast_to_string(left_ast)
-            right = self.ast_to_string(right_ast)
-
-            # Parenthesize children when their operator precedence is lower than parent
-            if left_ast and left_ast[0] == 'binop':
-                if prec(left_ast[1]) < prec(op) or (op == '^'):
-                    left = f"({left})"
-
-            if right_ast and right_ast[0] == 'binop':
-                if prec(right_ast[1]) < prec(op) or (op == '^'):
-                    right = f"({right})"
-
-            # Use ^ for power
-            if op == '^':
-                return f"{left}^{right}"
-            return f"{left} {op} {right}"
-
-        # Fallback
-        return str(ast)
-
-    def contains_arg(self, ast, arg_name):
-        """Return True if AST contains a reference to arg_name."""
+        handlers = self._to_string_handlers
+        results = {}
+        work = [(ast, False)]
+        while work:
+            node, visited = work.pop()
+            kind = node[0]
+            if kind == 'binop':
+                if not visited:
+                    work.append((node, True))
+                    if id(node[3]) not in results:
+                        work.append((node[3], False))
+                    if id(node[2]) not in results:
+                        work.append((node[2], False))
+                else:
+                    op = node[1]
+                    my_prec = _PREC.get(op, 0)
+                    left = self._wrap_child(results[id(node[2])], node[2], my_prec, op, False)
+                    right = self._wrap_child(results[id(node[3])], node[3], my_prec, op, True)
+                    # Use ^ for power
+                    if op == '^':
+                        results[id(node)] = f"{left}^{right}"
+                    else:
+                        results[id(node)] = f"{left} {op} {right}"
+            elif kind == 'unary':
+                if not visited:
+                    work.append((node, True))
+                    if id(node[2]) not in results:
+                        work.append((node[2], False))
+                else:
+                    operand = results[id(node[2])]
+                    # Parenthesize operand if it's a binary operation for
+                    # clarity: - (x + 2)
+                    if node[2] and node[2][0] is _NT_BINOP:
+                        results[id(node)] = f"{node[1]}({operand})"
+                    else:
+                        results[id(node)] = f"{node[1]}{operand}"
+            else:
+                handler = handlers.get(kind)
+                # Fallback for unknown nodes: raw tuple repr
+                results[id(node)] = handler(node) if handler is not None else str(node)
+        return results[id(ast)]
+
+    # --- ast_to_string per-node handlers ---
+    def _str_leaf(self, ast):
+        return ast[1]
+
+    def _str_imaginary(self, ast):
+        return 'i'
+
+    def _str_matrix(self, ast):
+        # Reconstruct matrix literal: nested joins over generators, no
+        # intermediate per-row lists
+        return ('[ '
+                + ' ; '.join('[ ' + ' , '.join(self.ast_to_string(e) for e in row) + ' ]'
+                             for row in ast[1])
+                + ' ]')
+
+    def _wrap_child(self, rendered, ast, parent_prec, parent_op, is_right):
+        """Parenthesize an already-rendered binop child where precedence
+        demands it.
+
+        Wraps when the child binds looser than the parent, always under '^',
+        and for same-precedence right operands of '-' and '/' (where
+        dropping the parens would change the meaning: a - (b - c)).
+        """
+        if ast and ast[0] is _NT_BINOP:
+            child_prec = _PREC.get(ast[1], 0)
+            if (child_prec < parent_prec or parent_op == '^'
+                    or (is_right and child_prec == parent_prec
+                        and parent_op in ('-', '/'))):
+                return f"({rendered})"
+        return rendered
+
+    def contains_arg(self, ast, arg_name, _memo=None):
+        """Return True if AST contains a reference to arg_name.
+
+        Iterative depth-first search with an explicit stack: no Python
+        frame per node and no recursion-limit worries on deep chains.
+        Subtrees are shared (see _substitute_spine), so render_function_body
+        asks about the same nodes repeatedly; _memo caches answers by node
+        id for the duration of one top-level walk. On a negative answer
+        every visited node is negative too, so all of them are memoized;
+        a positive answer early-exits and memoizes the hit and the root.
+        """
         if ast is None:
             return False
-        node_type = ast[0]
-        if node_type == 'variable':
-            return ast[1] == arg_name
-        if node_type in ('number', 'imaginary'):
-            return False
-        if node_type == 'matrix':
-            for row in ast[1]:
-                for elem in row:
-                    if self.contains_arg(elem, arg_name):
-                        return True
-            return False
-        if node_type == 'unary':
-            return self.contains_arg(ast[2], arg_name)
-        if node_type == 'binop':
-            return self.contains_arg(ast[2], arg_name) or self.contains_arg(ast[3], arg_name)
-        if node_type == 'call':
-            # arguments inside calls may contain arg_name
-            return self.contains_arg(ast[2], arg_name)
+        if _memo is None:
+            _memo = {}
+        cached = _memo.get(id(ast))
+        if cached is not None:
+            return cached
+        stack = [ast]
+        visited = []
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            cached = _memo.get(id(node))
+            if cached is not None:
+                if cached:
+                    _memo[id(ast)] = True
+                    return True
+                continue
+            visited.append(node)
+            node_type = node[0]
+            if node_type == _NT_VARIABLE:
+                if node[1] == arg_name:
+                    _memo[id(node)] = True
+                    _memo[id(ast)] = True
+                    return True
+            elif node_type == _NT_BINOP:
+                stack.append(node[2])
+                stack.append(node[3])
+            elif node_type == _NT_UNARY or node_type == _NT_CALL:
+                stack.append(node[2])
+            elif node_type == _NT_MATRIX:
+                for row in node[1]:
+                    stack.extend(row)
+        for node in visited:
+            _memo[id(node)] = False
         return False
 
     def format_value_for_display(self, value):
@@ -264,26 +476,47 @@ class Interpreter:
         convert to a decimal string for readability in function signatures.
         Tests that care about precise fraction strings still use evaluator outputs.
         """
-        from types_system import Rational, Complex
-        if isinstance(value, Rational):
-            if value.value.denominator == 1:
-                return str(value.value.numerator)
-            # show decimal for function-body display
-            return str(float(value.value))
-        if isinstance(value, Complex):
-            return str(value)
-        return str(value)
-
-    def render_function_body(self, body_ast, arg_name):
+        return self._display_formatters.get(type(value), str)(value)
+
+    def _fmt_rational(self, value):
+        if value.value.denominator == 1:
+            return str(value.value.numerator)
+        # show decimal for function-body display
+        return str(float(value.value))
+
+    def render_function_body(self, body_ast, arg_name, _memo=None):
+        """Cached front-end for _render_body.
+
+        The rendered string only depends on the body AST, the argument name
+        and the current variable environment, so results are memoized per
+        evaluator version (bumped on every assignment) in a small LRU.
+        Recursive calls pass _memo and bypass the cache.
+        """
+        if _memo is not None:
+            return self._render_body(body_ast, arg_name, _memo)
+        key = (id(body_ast), arg_name, self.evaluator._env_version)
+        entry = self._body_render_cache.get(key)
+        if entry is not None:
+            self._body_render_cache.move_to_end(key)
+            return entry[1]
+        result = self._render_body(body_ast, arg_name, {})
+        if len(self._body_render_cache) >= self.BODY_RENDER_CACHE_SIZE:
+            self._body_render_cache.popitem(last=False)
+        self._body_render_cache[key] = (body_ast, result)
+        return result
+
+    def _render_body(self, body_ast, arg_name, _memo):
         """Render function body AST substituting known variable values where possible.
 
         If a subtree does not contain the argument name, it will be evaluated now
         using the current evaluator variables and rendered as a concrete value.
         Otherwise the expression is rendered symbolically, leaving the argument
-        name intact.
+        name intact. One contains_arg memo (_memo) is shared across the whole
+        render — entry checks, flatten and every recursive call — so each
+        subtree is classified exactly once per top-level render.
         """
         # If subtree does not contain arg_name -> evaluate and format
-        if not self.contains_arg(body_ast, arg_name):
+        if not self.contains_arg(body_ast, arg_name, _memo):
             try:
                 val = self.evaluator.evaluate(body_ast)
                 return self.format_value_for_display(val) if val is not None else ""
@@ -292,66 +525,55 @@ class Interpreter:
                 return self.ast_to_string(body_ast)
 
         node_type = body_ast[0]
-        if node_type == 'binop':
+        if node_type == _NT_BINOP:
             left_ast = body_ast[2]
             right_ast = body_ast[3]
             op = body_ast[1]
 
-            def prec(a):
-                if a == '^':
-                    return 4
-                if a in ('*', '/', '%'):
-                    return 3
-                if a in ('+', '-'):
-                    return 2
-                return 0
-
-            # Special handling for addition/subtraction: flatten constant terms
+            # Special handling for addition/subtraction: flatten constant
+            # terms. The +/- spine is walked with an explicit work stack —
+            # no Python frame per node, no recursion limit on long sums.
+            # Each entry is (node, sign); subtraction flips the sign pushed
+            # for its right child. sym_terms collects (str, sign) pairs,
+            # const_sum accumulates constant-only subtrees as a raw Fraction
+            # (wrapped into a Rational exactly once, for display).
             if op in ('+', '-'):
-                from types_system import Rational
-
-                def flatten(ast_node):
-                    """Return (sym_terms, const_sum) where sym_terms is list of (str, sign)
-                    and const_sum is a Rational sum of constant-only subtrees.
-                    """
-                    if ast_node[0] == 'binop' and ast_node[1] in ('+', '-'):
-                        left_terms, left_const = flatten(ast_node[2])
-                        right_terms, right_const = flatten(ast_node[3])
-                        if ast_node[1] == '+':
-                            return left_terms + right_terms, left_const + right_const
-                        else:
-                            # subtraction: right terms invert sign
-                            inverted = [(s, -sign) for (s, sign) in right_terms]
-                            return left_terms + inverted, left_const - right_const
+                sym_terms = []
+                const_sum = Fraction(0)
+                stack = [(body_ast, 1)]
+                while stack:
+                    ast_node, sign = stack.pop()
+                    if ast_node[0] is _NT_BINOP and ast_node[1] in ('+', '-'):
+                        # push right first so the left child pops first,
+                        # preserving left-to-right term order
+                        stack.append((ast_node[3], sign if ast_node[1] == '+' else -sign))
+                        stack.append((ast_node[2], sign))
+                        continue
 
                     # If subtree contains the function arg, keep as symbolic term
-                    if self.contains_arg(ast_node, arg_name):
-                        term = self.render_function_body(ast_node, arg_name)
-                        return ([(term, 1)], Rational(0))
+                    if self.contains_arg(ast_node, arg_name, _memo):
+                        sym_terms.append((self.render_function_body(ast_node, arg_name, _memo), sign))
+                        continue
 
                     # Otherwise evaluate constant subtree
                     try:
                         val = self.evaluator.evaluate(ast_node)
                         if isinstance(val, Rational):
-                            return ([], val)
+                            const_sum += val.value if sign == 1 else -val.value
                         elif isinstance(val, (int, float)):
-                            return ([], Rational(val))
+                            const_sum += Fraction(val) * sign
                         else:
-                            # Non-rational constant (e.g., complex/matrix) -> keep symbolic
-                            term = self.render_function_body(ast_node, arg_name)
-                            return ([(term, 1)], Rational(0))
+                            # Non-rational constant (e.g., complex/matrix):
+                            # we already have its value, so format it
+                            # directly instead of re-walking the subtree
+                            sym_terms.append((self.format_value_for_display(val), sign))
                     except Exception:
                         # If evaluation fails, fallback to symbolic
-                        term = self.render_function_body(ast_node, arg_name)
-                        return ([(term, 1)], Rational(0))
-
-                terms, const_sum = flatten(body_ast)
-
-                sym_terms = terms
+                        sym_terms.append((self.render_function_body(ast_node, arg_name, _memo), sign))
                 # Build output preferring constant first, then symbolic terms
                 out_parts = []
-                if const_sum.value != 0:
-                    const_str = self.format_value_for_display(const_sum)
+                if const_sum != 0:
+                    const_str = self.format_value_for_display(Rational(const_sum))
                     out_parts.append(const_str)
 
                 for term, sign in sym_terms:
@@ -371,37 +593,37 @@ class Interpreter:
                 return ' '.join(out_parts).strip()
 
             # Fallback: non-add/sub handling uses precedence parenthesis
-            left = self.render_function_body(left_ast, arg_name)
-            right = self.render_function_body(right_ast, arg_name)
+            left = self.render_function_body(left_ast, arg_name, _memo)
+            right = self.render_function_body(right_ast, arg_name, _memo)
 
-            if left_ast and left_ast[0] == 'binop':
-                if prec(left_ast[1]) < prec(op) or (op == '^'):
+            if left_ast and left_ast[0] is _NT_BINOP:
+                if _PREC.get(left_ast[1], 0) < _PREC.get(op, 0) or (op == '^'):
                     left = f"({left})"
 
-            if right_ast and right_ast[0] == 'binop':
-                if prec(right_ast[1]) < prec(op) or (op == '^'):
+            if right_ast and right_ast[0] is _NT_BINOP:
+                if _PREC.get(right_ast[1], 0) < _PREC.get(op, 0) or (op == '^'):
                     right = f"({right})"
 
             if op == '^':
                 return f"{left}^{right}"
             return f"{left} {op} {right}"
-        if node_type == 'unary':
-            return f"{body_ast[1]}{self.render_function_body(body_ast[2], arg_name)}"
-        if node_type == 'variable':
+        if node_type == _NT_UNARY:
+            return f"{body_ast[1]}{self.render_function_body(body_ast[2], arg_name, _memo)}"
+        if node_type == _NT_VARIABLE:
             return body_ast[1]
-        if node_type == 'number':
+        if node_type == _NT_NUMBER:
             return body_ast[1]
-        if node_type == 'imaginary':
+        if node_type == _NT_IMAGINARY:
             return 'i'
-        if node_type == 'matrix':
+        if node_type == _NT_MATRIX:
             rows = []
             for row_ast in body_ast[1]:
-                row_elems = [self.render_function_body(elem, arg_name) for elem in row_ast]
+                row_elems = [self.render_function_body(elem, arg_name, _memo) for elem in row_ast]
                 rows.append('[ ' + ' , '.join(row_elems) + ' ]')
             return '[ ' + ' ; '.join(rows) + ' ]'
-        if node_type == 'call':
+        if node_type == _NT_CALL:
             func_name = body_ast[1]
-            arg_str = self.render_function_body(body_ast[2], arg_name)
+            arg_str = self.render_function_body(body_ast[2], arg_name, _memo)
             return f"{func_name}({arg_str})"
 
         return self.ast_to_string(body_ast)
@@ -419,99 +641,198 @@ class Interpreter:
         return "\n".join(result)
 
     def inline_function_calls(self, ast_node):
-        """Return a new AST where user-defined Function calls are inlined by
+        """Return an AST where user-defined Function calls are inlined by
         substituting the function body with the actual argument AST.
 
-        Only inlines calls where the callee is a `Function` stored in the evaluator.
+        Only inlines calls where the callee is a `Function` stored in the
+        evaluator. AST nodes are immutable tuples, so subtrees that need no
+        inlining are shared with the input rather than copied; a subtree that
+        comes back unchanged is returned as-is.
         """
-        from copy import deepcopy
         if ast_node is None:
             return None
-
-        node_type = ast_node[0]
-
-        if node_type == 'call':
-            func_name = ast_node[1]
-            arg_ast = ast_node[2]
-            # Try to get a user-defined Function
-            func_obj = self.evaluator.get_variable(func_name)
-            from types_system import Function
-            if isinstance(func_obj, Function):
-                # Substitute argument occurrences in the function body with the provided arg_ast
-                body_copy = deepcopy(func_obj.body_ast)
-                substituted = self._substitute_arg(body_copy, func_obj.arg_name, deepcopy(arg_ast))
-                # After substituting, recursively inline inside the substituted body
-                return self.inline_function_calls(substituted)
+        handler = self._inline_handlers.get(ast_node[0])
+        if handler is None:
+            # numbers, variables, imaginary: leaves, safe to share
+            return ast_node
+        return handler(ast_node)
+
+    # --- inline_function_calls per-node handlers ---
+    def _inline_call(self, ast_node):
+        func_name = ast_node[1]
+        arg_ast = ast_node[2]
+        # Try to get a user-defined Function
+        func_obj = self.evaluator.get_variable(func_name)
+        if isinstance(func_obj, Function):
+            # Substitute argument occurrences in the function body with the
+            # provided arg_ast. The set of body subtrees that mention the
+            # argument is computed once per function and cached, so repeated
+            # inlines rebuild only that spine and share everything else
+            # without even walking it.
+            body = func_obj.body_ast
+            key = (id(body), func_obj.arg_name)
+            # Entries pin the body tuple (same shape as _body_render_cache):
+            # after a redefinition the old body can be freed and a new one
+            # can land on the same id, so the identity check is what keeps
+            # a recycled id from serving the old spine.
+            entry = self._arg_paths_cache.get(key)
+            if entry is not None and entry[0] is body:
+                self._arg_paths_cache.move_to_end(key)
+                spine_ids = entry[1]
             else:
-                # Not a user function: keep call but recurse into its argument
-                return ('call', func_name, self.inline_function_calls(arg_ast))
-
-        if node_type == 'binop':
-            return ('binop', ast_node[1], self.inline_function_calls(ast_node[2]), self.inline_function_calls(ast_node[3]))
-
-        if node_type == 'unary':
-            return ('unary', ast_node[1], self.inline_function_calls(ast_node[2]))
-
-        if node_type == 'matrix':
-            new_rows = []
-            for row in ast_node[1]:
-                new_rows.append([self.inline_function_calls(elem) for elem in row])
-            return ('matrix', new_rows)
-
-        # numbers, variables, imaginary -> return deep copy
-        from copy import deepcopy as _dc
-        return _dc(ast_node)
+                spine_ids = set()
+                self._collect_arg_spine(body, func_obj.arg_name, spine_ids)
+                if len(self._arg_paths_cache) >= self.ARG_PATHS_CACHE_SIZE:
+                    self._arg_paths_cache.popitem(last=False)
+                self._arg_paths_cache[key] = (body, spine_ids)
+            substituted = self._substitute_spine(body, spine_ids, arg_ast)
+            # After substituting, recursively inline inside the substituted body
+            return self.inline_function_calls(substituted)
+        # Not a user function: keep call but recurse into its argument
+        new_arg = self.inline_function_calls(arg_ast)
+        if new_arg is arg_ast:
+            return ast_node
+        return ('call', func_name, new_arg)
+
+    def _inline_binop(self, ast_node):
+        left = self.inline_function_calls(ast_node[2])
+        right = self.inline_function_calls(ast_node[3])
+        if left is ast_node[2] and right is ast_node[3]:
+            return ast_node
+        return ('binop', ast_node[1], left, right)
+
+    def _inline_unary(self, ast_node):
+        operand = self.inline_function_calls(ast_node[2])
+        if operand is ast_node[2]:
+            return ast_node
+        return ('unary', ast_node[1], operand)
+
+    def _inline_matrix(self, ast_node):
+        new_rows = [[self.inline_function_calls(elem) for elem in row]
+                    for row in ast_node[1]]
+        return ('matrix', new_rows)
 
     def _substitute_arg(self, ast_node, arg_name, replacement_ast):
-        """Recursively replace variable nodes named arg_name with replacement_ast.
+        """Replace variable nodes named arg_name with replacement_ast.
 
-        Returns a new AST (does not modify inputs).
+        Inputs are never modified; tuples are immutable, so untouched
+        subtrees (and the replacement itself) are shared, and fresh tuples
+        are built only along paths that actually contain the argument.
         """
-        from copy import deepcopy
         if ast_node is None:
             return None
-        node_type = ast_node[0]
-        if node_type == 'variable':
-            if ast_node[1] == arg_name:
-                return deepcopy(replacement_ast)
-            return ('variable', ast_node[1])
-        if node_type == 'number':
-            return ('number', ast_node[1])
-        if node_type == 'imaginary':
-            return ('imaginary',)
-        if node_type == 'unary':
-            return ('unary', ast_node[1], self._substitute_arg(ast_node[2], arg_name, replacement_ast))
-        if node_type == 'binop':
-            return ('binop', ast_node[1], self._substitute_arg(ast_node[2], arg_name, replacement_ast), self._substitute_arg(ast_node[3], arg_name, replacement_ast))
-        if node_type == 'call':
-            return ('call', ast_node[1], self._substitute_arg(ast_node[2], arg_name, replacement_ast))
-        if node_type == 'matrix':
-            new_rows = []
-            for row in ast_node[1]:
-                new_rows.append([self._substitute_arg(elem, arg_name, replacement_ast) for elem in row])
+        handler = self._subst_handlers.get(ast_node[0])
+        if handler is None:
+            # numbers, imaginary and unknown nodes: nothing to substitute
+            return ast_node
+        return handler(ast_node, arg_name, replacement_ast)
+
+    # --- _substitute_arg per-node handlers ---
+    def _subst_variable(self, ast_node, arg_name, replacement_ast):
+        if ast_node[1] == arg_name:
+            return replacement_ast
+        return ast_node
+
+    def _subst_unary(self, ast_node, arg_name, replacement_ast):
+        operand = self._substitute_arg(ast_node[2], arg_name, replacement_ast)
+        if operand is ast_node[2]:
+            return ast_node
+        return ('unary', ast_node[1], operand)
+
+    def _subst_binop(self, ast_node, arg_name, replacement_ast):
+        left = self._substitute_arg(ast_node[2], arg_name, replacement_ast)
+        right = self._substitute_arg(ast_node[3], arg_name, replacement_ast)
+        if left is ast_node[2] and right is ast_node[3]:
+            return ast_node
+        return ('binop', ast_node[1], left, right)
+
+    def _subst_call(self, ast_node, arg_name, replacement_ast):
+        arg = self._substitute_arg(ast_node[2], arg_name, replacement_ast)
+        if arg is ast_node[2]:
+            return ast_node
+        return ('call', ast_node[1], arg)
+
+    def _subst_matrix(self, ast_node, arg_name, replacement_ast):
+        new_rows = [[self._substitute_arg(elem, arg_name, replacement_ast) for elem in row]
+                    for row in ast_node[1]]
+        return ('matrix', new_rows)
+
+    def _collect_arg_spine(self, node, arg_name, out):
+        """Record (in out) the ids of every subtree containing arg_name.
+
+        Returns True if node itself contains it. The ids stay valid for as
+        long as the function body is referenced, which the owning Function
+        guarantees.
+        """
+        kind = node[0]
+        if kind == 'variable':
+            found = node[1] == arg_name
+        elif kind in ('unary', 'call'):
+            found = self._collect_arg_spine(node[2], arg_name, out)
+        elif kind == 'binop':
+            found = self._collect_arg_spine(node[2], arg_name, out)
+            found = self._collect_arg_spine(node[3], arg_name, out) or found
+        elif kind == 'matrix':
+            found = False
+            for row in node[1]:
+                for elem in row:
+                    if self._collect_arg_spine(elem, arg_name, out):
+                        found = True
+        else:
+            found = False
+        if found:
+            out.add(id(node))
+        return found
+
+    def _substitute_spine(self, node, spine_ids, replacement_ast):
+        """_substitute_arg specialized by a precomputed spine-id set.
+
+        Subtrees whose id is not in spine_ids cannot contain the argument
+        and are returned unwalked; only the spine is rebuilt.
+        """
+        if id(node) not in spine_ids:
+            return node
+        kind = node[0]
+        if kind == 'variable':
+            # in the spine and a variable -> this is the argument itself
+            return replacement_ast
+        if kind == 'unary':
+            return ('unary', node[1], self._substitute_spine(node[2], spine_ids, replacement_ast))
+        if kind == 'binop':
+            return ('binop', node[1],
+                    self._substitute_spine(node[2], spine_ids, replacement_ast),
+                    self._substitute_spine(node[3], spine_ids, replacement_ast))
+        if kind == 'call':
+            return ('call', node[1], self._substitute_spine(node[2], spine_ids, replacement_ast))
+        if kind == 'matrix':
+            new_rows = [[self._substitute_spine(elem, spine_ids, replacement_ast) for elem in row]
+                        for row in node[1]]
             return ('matrix', new_rows)
-        # fallback: deepcopy
-        return deepcopy(ast_node)
+        return node
 
     def ast_has_variables(self, ast_node):
         """Return True if AST contains any variable nodes."""
         if ast_node is None:
             return False
-        node_type = ast_node[0]
-        if node_type == 'variable':
-            return True
-        if node_type in ('number', 'imaginary'):
+        handler = self._has_vars_handlers.get(ast_node[0])
+        if handler is None:
+            # numbers, imaginary and unknown nodes carry no variables
             return False
-        if node_type == 'matrix':
-            for row in ast_node[1]:
-                for elem in row:
-                    if self.ast_has_variables(elem):
-                        return True
-            return False
-        if node_type == 'unary':
-            return self.ast_has_variables(ast_node[2])
-        if node_type == 'binop':
-            return self.ast_has_variables(ast_node[2]) or self.ast_has_variables(ast_node[3])
-        if node_type == 'call':
-            return self.ast_has_variables(ast_node[2])
-        return False
+        return handler(ast_node)
+
+    # --- ast_has_variables per-node handlers ---
+    def _hv_variable(self, ast_node):
+        return True
+
+    def _hv_matrix(self, ast_node):
+        return any(self.ast_has_variables(elem)
+                   for row in ast_node[1] for elem in row)
+
+    def _hv_unary(self, ast_node):
+        return self.ast_has_variables(ast_node[2])
+
+    def _hv_binop(self, ast_node):
+        return self.ast_has_variables(ast_node[2]) or self.ast_has_variables(ast_node[3])
+
+    def _hv_call(self, ast_node):
+        return self.ast_has_variables(ast_node[2])
@@ -4,6 +4,7 @@ Handles tokenization and parsing of expressions
 """
 
 import re
+import sys
 from typing import List, Tuple, Union
 from types_system import Rational, Complex, Matrix
 
@@ -23,148 +24,218 @@ class Token:
 class Lexer:
     """Tokenizes mathematical expressions."""
 
+    # Compiled once at class-body evaluation; nothing ever compiles a
+    # pattern inside tokenize.
+    # Ordered by hit frequency: with the single-character fast path below,
+    # the master regex mostly sees numbers, identifiers, whitespace runs and
+    # '*'/'**', so those alternatives come first; the engine tries
+    # alternatives in order at each position.
     TOKEN_PATTERNS = [
-        ('NUMBER', r'\d+\.?\d*'),
-    # Identifiers: letters only (case-insensitive). Disallow names containing digits/underscores.
-    ('IDENTIFIER', r'[A-Za-z]+'),
-        ('ASSIGN', r'='),
-        ('MODULO', r'%'),
-        ('QUESTION', r'\?'),
-        ('PLUS', r'\+'),
-        ('MINUS', r'-'),
+        ('NUMBER', re.compile(r'\d+\.?\d*')),
+        # Identifiers: letters only (case-insensitive). Disallow names containing digits/underscores.
+        ('IDENTIFIER', re.compile(r'[A-Za-z]+')),
+        ('WHITESPACE', re.compile(r'\s+')),
         # Match matrix-multiplication operator '**' before single '*'
-        ('MATMUL', r'\*\*'),
-        ('MULTIPLY', r'\*'),
-        ('DIVIDE', r'/'),
-        ('POWER', r'\^'),
-        ('LPAREN', r'\('),
-        ('RPAREN', r'\)'),
-        ('LBRACKET', r'\['),
-        ('RBRACKET', r'\]'),
-        ('SEMICOLON', r';'),
-        ('COMMA', r','),
-        ('WHITESPACE', r'\s+'),
+        ('MATMUL', re.compile(r'\*\*')),
+        ('MULTIPLY', re.compile(r'\*')),
+        ('ASSIGN', re.compile(r'=')),
+        ('MODULO', re.compile(r'%')),
+        ('QUESTION', re.compile(r'\?')),
+        ('PLUS', re.compile(r'\+')),
+        ('MINUS', re.compile(r'-')),
+        ('DIVIDE', re.compile(r'/')),
+        ('POWER', re.compile(r'\^')),
+        ('LPAREN', re.compile(r'\(')),
+        ('RPAREN', re.compile(r'\)')),
+        ('LBRACKET', re.compile(r'\[')),
+        ('RBRACKET', re.compile(r'\]')),
+        ('SEMICOLON', re.compile(r';')),
+        ('COMMA', re.compile(r',')),
     ]
-    
+
+    # All patterns unioned into one named-group alternation, compiled once
+    # at class creation: the C regex engine walks the line in a single pass
+    # instead of trying each pattern separately at every position.
+    MASTER_RE = re.compile('|'.join(f'(?P<{name}>{pattern.pattern})'
+                                    for name, pattern in TOKEN_PATTERNS))
+
+    # Unambiguous single-character tokens resolved with one dict probe,
+    # skipping the regex machinery entirely; '*' is excluded because it may
+    # start the two-character '**' matmul operator.
+    SINGLE_CHAR_TOKENS = {
+        '=': 'ASSIGN',
+        '%': 'MODULO',
+        '?': 'QUESTION',
+        '+': 'PLUS',
+        '-': 'MINUS',
+        '/': 'DIVIDE',
+        '^': 'POWER',
+        '(': 'LPAREN',
+        ')': 'RPAREN',
+        '[': 'LBRACKET',
+        ']': 'RBRACKET',
+        ';': 'SEMICOLON',
+        ',': 'COMMA',
+    }
+
     def __init__(self, text: str):
         self.text = text
         self.pos = 0
         self.tokens = []
-    
+        # C-level substring scans, cheaper than a Python loop over tokens:
+        # Parser._classify uses these to rule out the equation form early.
+        self.has_equals = '=' in text
+        self.has_question = '?' in text
+
     def tokenize(self) -> List[Token]:
         """Convert input text into tokens."""
-        self.tokens = []
-        self.pos = 0
-        
-        while self.pos < len(self.text):
-            matched = False
-            
-            for token_type, pattern in self.TOKEN_PATTERNS:
-                regex = re.compile(pattern)
-                match = regex.match(self.text, self.pos)
-                
-                if match:
-                    value = match.group(0)
-                    if token_type != 'WHITESPACE':
-                        self.tokens.append(Token(token_type, value, self.pos))
-                    self.pos = match.end()
-                    matched = True
-                    break
-            
-            if not matched:
-                raise SyntaxError(f"Unexpected character '{self.text[self.pos]}' at position {self.pos}")
-        
-        return self.tokens
+        tokens = []
+        append = tokens.append
+        text = self.text
+        pos = 0
+        length = len(text)
+        match = self.MASTER_RE.match
+        single = self.SINGLE_CHAR_TOKENS
+
+        while pos < length:
+            c = text[pos]
+            token_type = single.get(c)
+            if token_type is not None:
+                append(Token(token_type, c, pos))
+                pos += 1
+                continue
+            if c == ' ':
+                pos += 1
+                continue
+            m = match(text, pos)
+            if m is None:
+                raise SyntaxError(f"Unexpected character '{text[pos]}' at position {pos}")
+            token_type = m.lastgroup
+            if token_type != 'WHITESPACE':
+                append(Token(token_type, m.group(0), pos))
+            pos = m.end()
+
+        self.pos = pos
+        self.tokens = tokens
+        return tokens
+
+
+# Binary-operator precedence by token type, for the precedence-climbing
+# expression loop below. '^' (POWER) is the only right-associative operator.
+_BINOP_PREC = {
+    'PLUS': 2,
+    'MINUS': 2,
+    'MULTIPLY': 3,
+    'DIVIDE': 3,
+    'MODULO': 3,
+    'MATMUL': 3,
+    'POWER': 4,
+}
+
+# Token type sets for the hot membership tests below. Token types are the
+# interned group names the master regex hands back from m.lastgroup, so
+# frozenset lookups hash-and-compare by identity instead of scanning a tuple.
+# _IMPLICIT_STARTERS: token types that can start a factor; a factor directly
+# following another factor means implicit multiplication (same precedence
+# as '*').
+_IMPLICIT_STARTERS = frozenset({'NUMBER', 'IDENTIFIER', 'LPAREN', 'LBRACKET'})
+_ADDITIVE_OPS = frozenset({'PLUS', 'MINUS'})
+_ROW_SEPARATORS = frozenset({'COMMA', 'SEMICOLON'})
 
 
 class Parser:
     """Parses tokens into an abstract syntax tree."""
     
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
+    def __init__(self, tokens: List[Token], maybe_equation: bool = True):
+        # EOF sentinel: current_token/peek_token become bare indexed reads
+        # with no bounds branch, and the sentinel's type matches no grammar
+        # rule so every parse loop falls out of it naturally.
+        eof_pos = tokens[-1].pos + len(tokens[-1].value) if tokens else 0
+        self.tokens = tokens + [Token('EOF', '', eof_pos)]
         self.pos = 0
-    
+        # When the caller's Lexer already knows the raw text lacks '=' or
+        # '?', _classify can skip its equation scan entirely.
+        self.maybe_equation = maybe_equation
+
     def current_token(self) -> Token:
         """Get current token without consuming it."""
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return None
-    
+        return self.tokens[self.pos]
+
     def consume(self, expected_type: str = None) -> Token:
         """Consume and return current token."""
-        token = self.current_token()
-        if token is None:
+        token = self.tokens[self.pos]
+        if token.type == 'EOF':
             raise SyntaxError("Unexpected end of input")
         if expected_type and token.type != expected_type:
             raise SyntaxError(f"Expected {expected_type}, got {token.type}")
         self.pos += 1
         return token
-    
+
     def peek_token(self, offset: int = 1) -> Token:
-        """Peek at token ahead without consuming."""
+        """Peek at token ahead without consuming (EOF past the end)."""
         pos = self.pos + offset
-        if pos < len(self.tokens):
-            return self.tokens[pos]
-        return None
-    
+        tokens = self.tokens
+        return tokens[pos] if pos < len(tokens) else tokens[-1]
+
     def parse(self):
         """Parse the token stream."""
-        if not self.tokens:
+        if self.tokens[0].type == 'EOF':
             return None
 
-        # Check if it's an equation or assignment. Prefer equation when a '?' is present
-        # so inputs like `funA(x) = y ?` are treated as equations rather than assignments.
-        if self.is_equation():
+        # Classify once. An equation is preferred when a '?' is present so
+        # inputs like `funA(x) = y ?` solve rather than assign.
+        kind = self._classify()
+        if kind == 'equation':
             result = self.parse_equation()
-        elif self.is_assignment():
+        elif kind == 'assignment':
             result = self.parse_assignment()
         else:
             result = self.parse_expression()
 
         # After parsing a complete statement, there should be no leftover tokens.
-        if self.current_token() is not None:
-            tok = self.current_token()
+        tok = self.current_token()
+        if tok.type != 'EOF':
             raise SyntaxError(f"Unexpected token after expression: '{tok.value}' at position {tok.pos}")
 
         return result
     
-    def is_assignment(self) -> bool:
-        """Check if this is an assignment statement."""
-        # Two forms:
-        # 1) IDENTIFIER = ...
-        # 2) IDENTIFIER ( IDENTIFIER ) = ...  (function assignment)
-        if not self.tokens:
-            return False
+    def _classify(self) -> str:
+        """Classify the statement kind with a single scan of the tokens.
 
-        if len(self.tokens) >= 2 and self.tokens[0].type == 'IDENTIFIER' and self.tokens[1].type == 'ASSIGN':
-            return True
+        Returns 'equation', 'assignment' or 'expression'. `name = ... ?`
+        stays an assignment (the '=' right after a leading identifier wins),
+        while `funA(x) = y ?` is an equation; both forms of assignment
+        (variable and function) report 'assignment'.
+        """
+        tokens = self.tokens
+        if len(tokens) >= 2 and tokens[0].type == 'IDENTIFIER' and tokens[1].type == 'ASSIGN':
+            return 'assignment'
+
+        if self.maybe_equation:
+            has_equals = False
+            has_question = False
+            for token in tokens:
+                if token.type == 'ASSIGN':
+                    has_equals = True
+                    if has_question:
+                        break
+                elif token.type == 'QUESTION':
+                    has_question = True
+                    if has_equals:
+                        break
+            if has_equals and has_question:
+                return 'equation'
 
         # function assignment detection
-        if len(self.tokens) >= 5:
-            return (self.tokens[0].type == 'IDENTIFIER' and
-                    self.tokens[1].type == 'LPAREN' and
-                    self.tokens[2].type == 'IDENTIFIER' and
-                    self.tokens[3].type == 'RPAREN' and
-                    self.tokens[4].type == 'ASSIGN')
-
-        return False
-    
-    def is_equation(self) -> bool:
-        """Check if this is an equation to solve."""
-        # Look for pattern with = and ? but not starting with assignment
-        has_equals = False
-        has_question = False
-        
-        for i, token in enumerate(self.tokens):
-            if token.type == 'ASSIGN':
-                # If = is after identifier at start, it's assignment
-                if i == 1 and self.tokens[0].type == 'IDENTIFIER':
-                    return False
-                has_equals = True
-            if token.type == 'QUESTION':
-                has_question = True
-        
-        return has_equals and has_question
+        if (len(tokens) >= 5 and
+                tokens[0].type == 'IDENTIFIER' and
+                tokens[1].type == 'LPAREN' and
+                tokens[2].type == 'IDENTIFIER' and
+                tokens[3].type == 'RPAREN' and
+                tokens[4].type == 'ASSIGN'):
+            return 'assignment'
+
+        return 'expression'
     
     def parse_assignment(self):
         """Parse variable assignment."""
@@ -185,12 +256,15 @@ class Parser:
             self.consume('RPAREN')
             self.consume('ASSIGN')
             expression = self.parse_expression()
-            return ('fun_assign', identifier.value, arg_token.value, expression)
+            # Identifiers are case-insensitive; normalize and intern here so
+            # downstream lookups are plain dict gets on interned keys.
+            return ('fun_assign', sys.intern(identifier.value.lower()),
+                    sys.intern(arg_token.value.lower()), expression)
 
         # normal variable assignment
         self.consume('ASSIGN')
         expression = self.parse_expression()
-        return ('assign', identifier.value, expression)
+        return ('assign', sys.intern(identifier.value.lower()), expression)
     
     def parse_equation(self):
         """Parse equation to solve."""
@@ -206,62 +280,52 @@ class Parser:
         return ('equation', left, right)
     
     def parse_expression(self):
-        """Parse an expression (handles addition and subtraction)."""
-        left = self.parse_term()
-        
-        while self.current_token() and self.current_token().type in ('PLUS', 'MINUS'):
-            op = self.consume()
-            # Disallow consecutive + or - sequences like '+-' or '--'
-            if self.current_token() and self.current_token().type in ('PLUS', 'MINUS'):
-                raise SyntaxError("Consecutive '+' or '-' operators are not allowed")
-            right = self.parse_term()
-            left = ('binop', op.value, left, right)
+        """Parse an expression (all binary-operator precedence levels)."""
+        return self.parse_binop_rhs(2)
 
-        return left
-    
-    def parse_term(self):
-        """Parse a term (handles multiplication and division)."""
-        left = self.parse_power()
+    def parse_binop_rhs(self, min_prec):
+        """Precedence-climbing loop for binary operators.
 
-        # Implicit multiplication support: when a factor is followed directly by
-        # another factor (NUMBER, IDENTIFIER, LPAREN, LBRACKET) treat it as '*'.
-        implicit_starters = ('NUMBER', 'IDENTIFIER', 'LPAREN', 'LBRACKET')
+        Parses a factor, then folds in operators whose precedence is at
+        least min_prec — one loop instead of one recursion level per
+        precedence tier. Left-associative operators recurse with prec+1,
+        the right-associative '^' with its own precedence. A factor
+        directly following another factor is implicit multiplication.
+        """
+        left = self.parse_factor()
 
-        while self.current_token():
+        while True:
             tok = self.current_token()
-            if tok.type in ('MULTIPLY', 'DIVIDE', 'MODULO', 'MATMUL'):
-                op = self.consume()
-                right = self.parse_power()
-                # Use '**' token for matrix multiplication or '*' for element-wise
-                if op.type == 'MATMUL':
-                    left = ('binop', '**', left, right)
-                else:
-                    left = ('binop', op.value, left, right)
-            elif tok.type in implicit_starters:
-                # implicit multiplication
-                right = self.parse_power()
-                left = ('binop', '*', left, right)
-            else:
+            token_type = tok.type
+            prec = _BINOP_PREC.get(token_type)
+            if prec is None:
+                # Implicit multiplication: binds like '*'
+                if token_type in _IMPLICIT_STARTERS and 3 >= min_prec:
+                    right = self.parse_binop_rhs(4)
+                    left = ('binop', '*', left, right)
+                    continue
+                break
+            if prec < min_prec:
                 break
+            self.consume()
+            # Disallow consecutive + or - sequences like '+-' or '--'
+            if token_type in _ADDITIVE_OPS:
+                nxt = self.current_token()
+                if nxt and nxt.type in _ADDITIVE_OPS:
+                    raise SyntaxError("Consecutive '+' or '-' operators are not allowed")
+            next_min = prec if token_type == 'POWER' else prec + 1
+            right = self.parse_binop_rhs(next_min)
+            # tok.value is already the evaluator's operator spelling
+            # ('**' for MATMUL, '^' for POWER)
+            left = ('binop', tok.value, left, right)
 
         return left
     
-    def parse_power(self):
-        """Parse power expressions."""
-        left = self.parse_factor()
-        
-        if self.current_token() and self.current_token().type == 'POWER':
-            op = self.consume()
-            right = self.parse_power()  # Right associative
-            left = ('binop', '^', left, right)
-        
-        return left
-    
     def parse_factor(self):
         """Parse a factor (number, variable, or parenthesized expression)."""
         token = self.current_token()
-        
-        if not token:
+
+        if token.type == 'EOF':
             raise SyntaxError("Unexpected end of expression")
         
         # Unary minus
@@ -288,8 +352,10 @@ class Parser:
         
         # Identifier (variable or 'i' for imaginary)
         if token.type == 'IDENTIFIER':
-            # Lookahead: could be function call or variable
-            ident = token.value
+            # Lookahead: could be function call or variable.
+            # Names are case-insensitive: lowercase and intern once at parse
+            # time so evaluator dict probes hash/compare interned keys.
+            ident = sys.intern(token.value.lower())
             self.consume()
             if ident == 'i':
                 return ('imaginary',)
@@ -306,6 +372,29 @@ class Parser:
         
         raise SyntaxError(f"Unexpected token: {token.type}")
     
+    def _count_row_elements(self) -> int:
+        """Count the elements of the bracketed row starting at self.pos.
+
+        Scans forward over the already-materialized token list to the
+        matching RBRACKET, counting top-level commas; nested brackets
+        (matrix-valued elements) are skipped by depth tracking. Used to
+        presize row lists in parse_matrix.
+        """
+        tokens = self.tokens
+        depth = 0
+        commas = 0
+        for i in range(self.pos, len(tokens)):
+            token_type = tokens[i].type
+            if token_type == 'LBRACKET':
+                depth += 1
+            elif token_type == 'RBRACKET':
+                if depth == 0:
+                    break
+                depth -= 1
+            elif token_type == 'COMMA' and depth == 0:
+                commas += 1
+        return commas + 1
+
     def parse_matrix(self):
         """Parse matrix literal: [[1, 2], [3, 4]] or [1, 2; 3, 4]."""
         self.consume('LBRACKET')
@@ -317,17 +406,25 @@ class Parser:
             # Check for nested brackets (row format)
             if self.current_token().type == 'LBRACKET':
                 self.consume('LBRACKET')
-                row = []
+                # Allocate the row at its final size up front (a cheap
+                # forward scan over the token list) instead of growing it
+                # append by append.
+                cols = self._count_row_elements()
+                row = [None] * cols
+                idx = 0
                 while self.current_token() and self.current_token().type != 'RBRACKET':
-                    row.append(self.parse_expression())
+                    row[idx] = self.parse_expression()
+                    idx += 1
                     if self.current_token() and self.current_token().type == 'COMMA':
                         self.consume('COMMA')
                     elif self.current_token() and self.current_token().type != 'RBRACKET':
                         break
                 self.consume('RBRACKET')
+                if idx != cols:
+                    del row[idx:]
                 rows.append(row)
                 
-                if self.current_token() and self.current_token().type in ('COMMA', 'SEMICOLON'):
+                if self.current_token() and self.current_token().type in _ROW_SEPARATORS:
                     # Allow comma or semicolon between nested row brackets
                     if self.current_token().type == 'COMMA':
                         self.consume('COMMA')
@@ -5,11 +5,37 @@ Exposes plot_function(evaluator, function_obj, start, end, points=200)
 which tries to use matplotlib when available and falls back to a small ASCII
 plot when matplotlib is not installed or cannot be used.
 """
+from array import array
 from typing import List
 import math
 import tempfile
 import os
 
+# Import matplotlib once at module load (this module is itself only imported
+# on the first plot command): backend selection and the rcParams scan cost
+# hundreds of milliseconds, so paying them per plot_function call is waste.
+try:
+    import matplotlib
+    # Use Agg to avoid requiring a display
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as _plt
+except Exception:
+    _plt = None
+
+# One Figure/Axes pair reused across plot calls (created lazily on the first
+# matplotlib plot): building a fresh figure per call re-runs Axes and ticker
+# setup, which dominates wall time over the actual draw for small plots.
+_FIG = None
+_AX = None
+
+
+def _get_axes():
+    global _FIG, _AX
+    if _FIG is None:
+        _FIG, _AX = _plt.subplots(figsize=(6, 3))
+    return _FIG, _AX
+
+
 def _float_from_value(val):
     """Return a float from Rational or Complex where possible, otherwise raise."""
     from types_system import Rational, Complex
@@ -25,6 +51,103 @@ def _float_from_value(val):
     raise TypeError(f"Cannot convert {type(val)} to float for plotting")
 
 
+def _compile_float_closure(body_ast, arg_name):
+    """Lower a purely arithmetic body to a closure over plain floats.
+
+    Plotting only ever needs float samples, so bodies built from numbers,
+    the argument and the scalar operators can skip exact Fraction math
+    entirely and run on C doubles. Returns None when the body references
+    free variables, i, matrices or calls; those go through the evaluator.
+    """
+    def emit(node):
+        kind = node[0]
+        if kind == 'number':
+            return repr(float(node[1]))
+        if kind == 'variable':
+            return '_arg' if node[1] == arg_name else None
+        if kind == 'unary':
+            if node[1] != '-':
+                return None
+            operand = emit(node[2])
+            return f'(-{operand})' if operand is not None else None
+        if kind == 'binop':
+            op = node[1]
+            if op not in ('+', '-', '*', '/', '%', '^'):
+                return None
+            left = emit(node[2])
+            right = emit(node[3]) if left is not None else None
+            if right is None:
+                return None
+            return f'({left} {"**" if op == "^" else op} {right})'
+        return None
+
+    expr = emit(body_ast)
+    if expr is None:
+        return None
+    namespace = {}
+    try:
+        exec(f'def _compiled(_arg):\n    return {expr}', namespace)
+    except (SyntaxError, RecursionError, MemoryError):
+        # Long operator chains overflow CPython's parser nesting limit
+        # (every binop is parenthesized); sample via the evaluator instead.
+        return None
+    return namespace['_compiled']
+
+
+def _sample_function(evaluator, function_obj, xs):
+    """Evaluate function_obj at every x in xs, compiling the body once.
+
+    Purely arithmetic bodies run through the evaluator's exec'd closure;
+    anything else is flattened to an RPN program once and evaluated with a
+    single reusable argument scope. Either way the body AST is lowered one
+    time instead of once per sample. Points that error or produce
+    non-plottable values become NaN.
+    """
+    from collections import ChainMap
+    from types_system import Rational
+
+    nan = float('nan')
+    # unboxed double buffer; cheaper than a list of PyFloats to fill and scan
+    ys = array('d')
+    append = ys.append
+
+    fast = _compile_float_closure(function_obj.body_ast, function_obj.arg_name)
+    if fast is not None:
+        for x in xs:
+            try:
+                y = fast(x)
+                # float ** can yield complex (negative base, fractional
+                # exponent); treat anything non-real as unplottable
+                append(float(y) if isinstance(y, (int, float)) else nan)
+            except Exception:
+                append(nan)
+        return ys
+
+    compiled = evaluator.compile_closure(function_obj.body_ast, function_obj.arg_name)
+    if compiled is not None:
+        for x in xs:
+            try:
+                append(_float_from_value(compiled(Rational(x))))
+            except Exception:
+                append(nan)
+        return ys
+
+    program = evaluator.compile_rpn(function_obj.body_ast)
+    scope = {function_obj.arg_name: None}
+    prev_vars = evaluator.variables
+    evaluator.variables = ChainMap(scope, prev_vars)
+    try:
+        for x in xs:
+            scope[function_obj.arg_name] = Rational(x)
+            try:
+                append(_float_from_value(evaluator.evaluate_rpn(program)))
+            except Exception:
+                append(nan)
+    finally:
+        evaluator.variables = prev_vars
+    return ys
+
+
 def plot_function(evaluator, function_obj, start: float, end: float, points: int = 200):
     """Sample the given single-argument Function object over [start, end].
 
@@ -32,7 +155,7 @@ def plot_function(evaluator, function_obj, start: float, end: float, points: int
     function_obj: types_system.Function instance
     Returns: a short message (path to saved PNG) or an ASCII plot string.
     """
-    from types_system import Function, Rational
+    from types_system import Function
 
     if not isinstance(function_obj, Function):
         raise TypeError("plot_function expects a Function object")
@@ -41,83 +164,73 @@ def plot_function(evaluator, function_obj, start: float, end: float, points: int
     if start == end:
         raise ValueError("start and end must differ")
 
-    # build sampling xs
-    xs = [start + i * (end - start) / (points - 1) for i in range(points)]
-    ys = []
+    # build sampling xs (contiguous doubles), then evaluate the compiled
+    # body at each one
+    step = (end - start) / (points - 1)
+    xs = array('d', (start + i * step for i in range(points)))
+    ys = _sample_function(evaluator, function_obj, xs)
 
-    # Evaluate for each x; skip points that error or return non-scalar
-    for x in xs:
+    # Try matplotlib first (cached module-level import)
+    if _plt is not None:
         try:
-            # Make a local evaluator with same variables
-            local_evaluator = evaluator.__class__(evaluator.variables)
-            # Bind argument name to Rational(x)
-            local_evaluator.assign(function_obj.arg_name, Rational(float(x)))
-            val = local_evaluator.evaluate(function_obj.body_ast)
-            y = _float_from_value(val)
-            ys.append(y)
-        except Exception:
-            # mark as NaN so plotting can skip
-            ys.append(float('nan'))
+            # prepare data, filter out NaNs
+            xs_plot = [x for x, y in zip(xs, ys) if not math.isnan(y)]
+            ys_plot = [y for y in ys if not math.isnan(y)]
 
-    # Try matplotlib first
-    try:
-        import matplotlib
-        # Use Agg to avoid requiring a display
-        matplotlib.use('Agg')
-        import matplotlib.pyplot as plt
+            if not xs_plot:
+                return "No plottable numeric points were produced"
 
-        # prepare data, filter out NaNs
-        xs_plot = [x for x, y in zip(xs, ys) if not math.isnan(y)]
-        ys_plot = [y for y in ys if not math.isnan(y)]
+            fig, ax = _get_axes()
+            ax.clear()
+            ax.plot(xs_plot, ys_plot, marker='.', linestyle='-', markersize=3)
+            title = f"{function_obj.name or 'f'}({function_obj.arg_name})"
+            ax.set_title(title)
+            ax.set_xlabel(function_obj.arg_name)
+            ax.set_ylabel('f')
+            ax.grid(True)
+
+            tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.png', prefix='computor_plot_')
+            tmp_path = tmp.name
+            tmp.close()
+            fig.tight_layout()
+            fig.savefig(tmp_path)
+            return f"Plot saved to {tmp_path}"
+        except Exception:
+            pass
 
-        if not xs_plot:
+    # Fallback to ASCII plot
+    try:
+        cols = 60
+        rows = 20
+        # filter valid points
+        pairs = [(x, y) for x, y in zip(xs, ys) if not math.isnan(y) and math.isfinite(y)]
+        if not pairs:
             return "No plottable numeric points were produced"
+        xs_valid = [p[0] for p in pairs]
+        ys_valid = [p[1] for p in pairs]
+        ymin = min(ys_valid)
+        ymax = max(ys_valid)
+        if ymin == ymax:
+            ymin -= 1
+            ymax += 1
+        # One flat byte row per grid line: marking a point is a single
+        # indexed byte store, and the scale factors are hoisted out of
+        # the loop instead of being recomputed per point.
+        grid = [bytearray(b' ' * cols) for _ in range(rows)]
+        last_row = rows - 1
+        col_scale = (cols - 1) / (len(pairs) - 1)
+        inv_span = 1.0 / (ymax - ymin)
+        for i, (x, y) in enumerate(pairs):
+            col = int(i * col_scale)
+            # map y to row (top is 0)
+            row = int((1 - (y - ymin) * inv_span) * last_row)
+            if row < 0:
+                row = 0
+            elif row > last_row:
+                row = last_row
+            grid[row][col] = 0x2A  # '*'
 
-        plt.figure(figsize=(6, 3))
-        plt.plot(xs_plot, ys_plot, marker='.', linestyle='-', markersize=3)
-        title = f"{function_obj.name or 'f'}({function_obj.arg_name})"
-        plt.title(title)
-        plt.xlabel(function_obj.arg_name)
-        plt.ylabel('f')
-        plt.grid(True)
-
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.png', prefix='computor_plot_')
-        tmp_path = tmp.name
-        tmp.close()
-        plt.tight_layout()
-        plt.savefig(tmp_path)
-        plt.close()
-        return f"Plot saved to {tmp_path}"
-    except Exception:
-        # Fallback to ASCII plot
-        try:
-            cols = 60
-            rows = 20
-            # filter valid points
-            pairs = [(x, y) for x, y in zip(xs, ys) if not math.isnan(y) and math.isfinite(y)]
-            if not pairs:
-                return "No plottable numeric points were produced"
-            xs_valid = [p[0] for p in pairs]
-            ys_valid = [p[1] for p in pairs]
-            ymin = min(ys_valid)
-            ymax = max(ys_valid)
-            if ymin == ymax:
-                ymin -= 1
-                ymax += 1
-            grid = [[' ' for _ in range(cols)] for _ in range(rows)]
-            for i, (x, y) in enumerate(pairs):
-                # map x to column
-                col = int((i / (len(pairs) - 1)) * (cols - 1))
-                # map y to row (top is 0)
-                row = int((1 - (y - ymin) / (ymax - ymin)) * (rows - 1))
-                row = max(0, min(rows - 1, row))
-                grid[row][col] = '*'
-
-            # Compose ASCII lines
-            lines = []
-            for r in grid:
-                lines.append(''.join(r))
-            footer = f"x in [{start}, {end}], {len(pairs)}/{len(xs)} points plottable"
-            return "\n".join(lines) + "\n" + footer
-        except Exception as e:
-            return f"Plot failed: {e}"
+        footer = f"x in [{start}, {end}], {len(pairs)}/{len(xs)} points plottable"
+        return "\n".join(r.decode('ascii') for r in grid) + "\n" + footer
+    except Exception as e:
+        return f"Plot failed: {e}"
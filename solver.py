@@ -2,29 +2,60 @@
 Equation solver for polynomial equations of degree <= 2
 """
 
+from fractions import Fraction
+
 from types_system import Rational, Complex
 from evaluator import Evaluator
 from parser import Lexer, Parser
-import re
+import math
 from typing import List, Tuple, Union
 
+# Shared small-constant singletons: every Rational construction normalizes a
+# Fraction, and Rational arithmetic is pure-functional, so the solver's hot
+# paths reuse these instead of allocating fresh zeros/ones per node.
+_R0 = Rational.ZERO
+_R1 = Rational.ONE
+
 
 class EquationSolver:
     """Solves polynomial equations of degree <= 2."""
     
     def __init__(self, evaluator: Evaluator):
         self.evaluator = evaluator
+        # Per-node-type and per-operator dispatch for ast_to_polynomial:
+        # one dict probe replaces the if/elif string-compare chains, same
+        # pattern as the evaluator's handler tables.
+        self._poly_node_handlers = {
+            'number': self._poly_number,
+            'variable': self._poly_variable,
+            'binop': self._poly_binop,
+            'unary': self._poly_unary,
+        }
+        self._poly_op_handlers = {
+            '+': self._poly_add,
+            '-': self._poly_sub,
+            '*': self._poly_mul,
+            '^': self._poly_pow,
+        }
     
     def solve(self, left_ast, right_ast) -> str:
         """
         Solve an equation of the form left = right.
         Returns a string with the solution.
         """
+        # Identical sides need no reduction at all: AST tuples compare
+        # structurally, and identical expressions always evaluate equal.
+        if right_ast is not None and left_ast == right_ast:
+            return "The equation is always true"
+
         # Inline function calls so equations like f(x) = y ? where f was defined
-        # as a Function(arg, body) are expanded before solving.
-        left_ast = self._inline_calls(left_ast)
+        # as a Function(arg, body) are expanded before solving. One id-keyed
+        # memo is shared across both sides, so subtrees repeated within the
+        # equation are expanded only once per solve.
+        memo = {}
+        left_ast = self._inline_calls(left_ast, memo)
         if right_ast is not None:
-            right_ast = self._inline_calls(right_ast)
+            right_ast = self._inline_calls(right_ast, memo)
 
         # Try to simplify to standard form: ax^2 + bx + c = 0
         # For now, we'll handle simple cases
@@ -43,92 +74,146 @@ class EquationSolver:
         # Collect terms and coefficients
         left_poly = self.ast_to_polynomial(left_ast, variable)
         right_poly = self.ast_to_polynomial(right_ast, variable)
-        
+
         # Move everything to left side: left - right = 0
-        coeffs = {}
-        for power, coeff in left_poly.items():
-            coeffs[power] = coeffs.get(power, Rational(0)) + coeff
-        for power, coeff in right_poly.items():
-            coeffs[power] = coeffs.get(power, Rational(0)) - coeff
-        
+        coeffs = self._poly_sub(left_poly, right_poly)
+
+        # Trim trailing zero coefficients once up front: cancelled
+        # high-order terms (x^3 - x^3 + ...) no longer inflate the degree,
+        # and later scans never re-test them.
+        while len(coeffs) > 1 and coeffs[-1].value == 0:
+            coeffs.pop()
+
         # Get degree
-        degree = max(coeffs.keys()) if coeffs else 0
-        
+        degree = len(coeffs) - 1
+
         if degree > 2:
             return f"The polynomial degree is strictly greater than 2, I can't solve."
-        
+
         # Get coefficients a, b, c for ax^2 + bx + c = 0
-        c = coeffs.get(0, Rational(0))
-        b = coeffs.get(1, Rational(0))
-        a = coeffs.get(2, Rational(0))
+        zero = _R0
+        c = coeffs[0]
+        b = coeffs[1] if degree >= 1 else zero
+        a = coeffs[2] if degree >= 2 else zero
         
-        # Display reduced form
+        # Display reduced form. Output lines are collected in a list and
+        # joined once at the end instead of growing a string with +=.
         reduced_form = self.format_polynomial(coeffs, variable)
-        result = f"Reduced form: {reduced_form} = 0\n"
-        result += f"Polynomial degree: {degree}\n"
-        
+        parts = [f"Reduced form: {reduced_form} = 0",
+                 f"Polynomial degree: {degree}"]
+
         # Solve based on degree
         if degree == 0:
             if c.value == 0:
-                result += "All real numbers are solutions"
+                parts.append("All real numbers are solutions")
             else:
-                result += "No solution"
+                parts.append("No solution")
         elif degree == 1:
             # bx + c = 0 => x = -c/b
             if b.value == 0:
-                result += "No solution"
+                parts.append("No solution")
             else:
                 x = -c / b
-                result += f"The solution is:\n{x}"
+                parts.append("The solution is:")
+                parts.append(str(x))
         else:  # degree == 2
             # ax^2 + bx + c = 0
             # Use quadratic formula: x = (-b ± √(b²-4ac)) / 2a
-            discriminant = b * b - Rational(4) * a * c
-            result += f"Discriminant: {discriminant}\n"
-            
-            if discriminant.value > 0:
+            # The whole branch runs on the underlying Fractions directly:
+            # one unwrap per coefficient up front, one Rational wrap per
+            # printed value, and no Rational dispatch in between.
+            av, bv, cv = a.value, b.value, c.value
+            disc_val = bv * bv - 4 * av * cv
+            two_a = 2 * av
+            parts.append(f"Discriminant: {Rational(disc_val)}")
+
+            if disc_val > 0:
                 # Two real solutions
-                sqrt_disc = Rational(float(discriminant.value) ** 0.5)
-                x1 = (-b + sqrt_disc) / (Rational(2) * a)
-                x2 = (-b - sqrt_disc) / (Rational(2) * a)
-                result += "Discriminant is strictly positive, the two solutions are:\n"
-                result += f"{x1}\n{x2}"
-            elif discriminant.value == 0:
+                sqrt_disc = self._sqrt_rational(disc_val).value
+                x1 = (-bv + sqrt_disc) / two_a
+                x2 = (-bv - sqrt_disc) / two_a
+                parts.append("Discriminant is strictly positive, the two solutions are:")
+                parts.append(str(Rational(x1)))
+                parts.append(str(Rational(x2)))
+            elif disc_val == 0:
                 # One solution
-                x = -b / (Rational(2) * a)
-                result += "Discriminant is zero, the solution is:\n"
-                result += f"{x}"
+                parts.append("Discriminant is zero, the solution is:")
+                parts.append(str(Rational(-bv / two_a)))
             else:
                 # Complex solutions
-                real_part = -b / (Rational(2) * a)
-                imag_part = Rational(float((-discriminant.value) ** 0.5)) / (Rational(2) * a)
-                result += "Discriminant is strictly negative, the two complex solutions are:\n"
-                c1 = Complex(real_part, imag_part)
-                c2 = Complex(real_part, -imag_part)
-                result += f"{c1}\n{c2}"
-        
-        return result
+                real_part = -bv / two_a
+                imag_part = self._sqrt_rational(-disc_val).value / two_a
+                parts.append("Discriminant is strictly negative, the two complex solutions are:")
+                parts.append(str(Complex(Rational(real_part), Rational(imag_part))))
+                parts.append(str(Complex(Rational(real_part), Rational(-imag_part))))
+
+        return "\n".join(parts)
     
+    def _sqrt_rational(self, value: Fraction) -> Rational:
+        """Square root of a non-negative Fraction, exact when possible.
+
+        Perfect-square numerator and denominator (checked with math.isqrt,
+        pure integer arithmetic) give an exact Rational without any float
+        round-trip, so discriminants like 16 or 9/4 produce exact roots.
+        Everything else falls back to the float root the solver always used.
+        """
+        num = value.numerator
+        den = value.denominator
+        root_num = math.isqrt(num)
+        if root_num * root_num == num:
+            root_den = math.isqrt(den)
+            if root_den * root_den == den:
+                return Rational(Fraction(root_num, root_den))
+        return Rational(float(value) ** 0.5)
+
     def find_variable(self, *asts) -> str:
-        """Find the variable name in the AST."""
-        for ast in asts:
-            var = self._find_variable_recursive(ast)
-            if var:
-                return var
+        """Find the variable name in the ASTs (first in DFS order).
+
+        One explicit-stack scan over all sides with early exit on the
+        first variable node, instead of one recursive walk per side —
+        no Python frame per node and both equation sides share the scan.
+        """
+        stack = list(reversed(asts))
+        while stack:
+            ast = stack.pop()
+            if not ast or not isinstance(ast, tuple):
+                continue
+            node_type = ast[0]
+            if node_type == 'variable':
+                return ast[1]
+            if node_type in ('binop', 'unary'):
+                for i in range(len(ast) - 1, 1, -1):
+                    stack.append(ast[i])
         return None
 
-    def _inline_calls(self, ast):
+    def _inline_calls(self, ast, _memo=None):
         """Recursively replace function calls with their body ASTs (substituting the argument).
 
         If ast is None, return None. For ('call', name, arg_ast) where `name` is a
         Function stored in evaluator.variables, substitute the function's body
         replacing occurrences of its argument name with arg_ast. Non-function
         calls or missing functions are left as-is.
+
+        ASTs are immutable tuples, so results are memoized by node id for the
+        duration of one solve and untouched subtrees are returned as-is:
+        repeated or call-free subtrees cost one dict probe instead of a
+        re-clone, which keeps nested f(f(x))-style expansions from re-walking
+        shared structure. Entries store the keyed node alongside the result:
+        ids of freed temporaries get recycled, so a bare id key could serve a
+        stale entry for a different node; pinning the node in the value keeps
+        its id valid for the memo's lifetime, and the identity check rejects
+        any entry that was keyed by an object this node did not come from.
         """
         if ast is None:
             return None
         if not isinstance(ast, tuple):
             return ast
+        if _memo is None:
+            _memo = {}
+        key = id(ast)
+        cached = _memo.get(key)
+        if cached is not None and cached[0] is ast:
+            return cached[1]
 
         node_type = ast[0]
         if node_type == 'call':
@@ -140,182 +225,193 @@ class EquationSolver:
                 # perform substitution: replace func.arg_name in func.body_ast with arg_ast
                 substituted = self._substitute(func.body_ast, func.arg_name, arg_ast)
                 # inline recursively in case body contains calls
-                return self._inline_calls(substituted)
+                result = self._inline_calls(substituted, _memo)
             else:
                 # Not a function: leave call as-is but inline inside argument
-                return ('call', func_name, self._inline_calls(arg_ast))
-
-        # Recursively process children
-        if node_type in ('binop',):
-            return (node_type, ast[1], self._inline_calls(ast[2]), self._inline_calls(ast[3]))
-        if node_type == 'unary':
-            return ('unary', ast[1], self._inline_calls(ast[2]))
-        if node_type == 'matrix':
-            return ('matrix', [[self._inline_calls(e) for e in row] for row in ast[1]])
-        # other nodes unchanged
-        return ast
-
-    def _substitute(self, ast, var_name, replacement):
-        """Return AST with variable var_name replaced by replacement AST."""
+                arg = self._inline_calls(arg_ast, _memo)
+                result = ast if arg is arg_ast else ('call', func_name, arg)
+        elif node_type == 'binop':
+            left = self._inline_calls(ast[2], _memo)
+            right = self._inline_calls(ast[3], _memo)
+            result = (ast if left is ast[2] and right is ast[3]
+                      else ('binop', ast[1], left, right))
+        elif node_type == 'unary':
+            operand = self._inline_calls(ast[2], _memo)
+            result = ast if operand is ast[2] else ('unary', ast[1], operand)
+        elif node_type == 'matrix':
+            result = ('matrix', [[self._inline_calls(e, _memo) for e in row]
+                                 for row in ast[1]])
+        else:
+            # other nodes unchanged
+            result = ast
+        _memo[key] = (ast, result)
+        return result
+
+    def _substitute(self, ast, var_name, replacement, _memo=None):
+        """Return AST with variable var_name replaced by replacement AST.
+
+        Memoized by node id for one top-level substitution (var_name and
+        replacement are fixed within it); subtrees without the variable come
+        back unchanged, preserving sharing with the function body. As in
+        _inline_calls, entries pin the keyed node so recycled ids of freed
+        temporaries cannot alias a live entry.
+        """
         if ast is None:
             return None
         if not isinstance(ast, tuple):
             return ast
+        if _memo is None:
+            _memo = {}
+        key = id(ast)
+        cached = _memo.get(key)
+        if cached is not None and cached[0] is ast:
+            return cached[1]
 
         node_type = ast[0]
-        if node_type == 'variable' and ast[1] == var_name:
-            return replacement
         if node_type == 'variable':
-            return ast
-        if node_type == 'number' or node_type == 'imaginary':
-            return ast
-        if node_type == 'unary':
-            return ('unary', ast[1], self._substitute(ast[2], var_name, replacement))
-        if node_type == 'binop':
-            return ('binop', ast[1], self._substitute(ast[2], var_name, replacement), self._substitute(ast[3], var_name, replacement))
-        if node_type == 'call':
-            return ('call', ast[1], self._substitute(ast[2], var_name, replacement))
-        if node_type == 'matrix':
-            return ('matrix', [[self._substitute(e, var_name, replacement) for e in row] for row in ast[1]])
-        return ast
-    
-    def _find_variable_recursive(self, ast) -> str:
-        """Recursively find variable in AST."""
-        if not ast or not isinstance(ast, tuple):
-            return None
-        
-        node_type = ast[0]
-        
-        if node_type == 'variable':
-            return ast[1]
-        elif node_type in ('binop', 'unary'):
-            for i in range(2, len(ast)):
-                var = self._find_variable_recursive(ast[i])
-                if var:
-                    return var
-        
-        return None
+            result = replacement if ast[1] == var_name else ast
+        elif node_type == 'number' or node_type == 'imaginary':
+            result = ast
+        elif node_type == 'unary':
+            operand = self._substitute(ast[2], var_name, replacement, _memo)
+            result = ast if operand is ast[2] else ('unary', ast[1], operand)
+        elif node_type == 'binop':
+            left = self._substitute(ast[2], var_name, replacement, _memo)
+            right = self._substitute(ast[3], var_name, replacement, _memo)
+            result = (ast if left is ast[2] and right is ast[3]
+                      else ('binop', ast[1], left, right))
+        elif node_type == 'call':
+            arg = self._substitute(ast[2], var_name, replacement, _memo)
+            result = ast if arg is ast[2] else ('call', ast[1], arg)
+        elif node_type == 'matrix':
+            result = ('matrix', [[self._substitute(e, var_name, replacement, _memo)
+                                  for e in row] for row in ast[1]])
+        else:
+            result = ast
+        _memo[key] = (ast, result)
+        return result
     
-    def ast_to_polynomial(self, ast, variable: str) -> dict:
+    # --- flat polynomial representation: list of Rational indexed by power ---
+    def _poly_add(self, left: list, right: list) -> list:
+        """Elementwise sum of two coefficient lists (padding the shorter)."""
+        if len(left) < len(right):
+            left, right = right, left
+        result = list(left)
+        for power, coeff in enumerate(right):
+            result[power] = result[power] + coeff
+        return result
+
+    def _poly_sub(self, left: list, right: list) -> list:
+        """Elementwise difference left - right of two coefficient lists."""
+        n = len(right)
+        if len(left) < n:
+            result = list(left) + [_R0] * (n - len(left))
+        else:
+            result = list(left)
+        for power in range(n):
+            result[power] = result[power] - right[power]
+        return result
+
+    def ast_to_polynomial(self, ast, variable: str) -> list:
         """
         Convert AST to polynomial coefficients.
-        Returns dict mapping power to coefficient.
+        Returns a list of coefficients indexed by power (length degree+1):
+        flat indexed storage instead of a dict, so combining polynomials is
+        list arithmetic with no hashing. Node types and binary operators
+        dispatch through the handler tables built in __init__.
         """
         if not ast or not isinstance(ast, tuple):
-            return {0: Rational(0)}
-        
-        node_type = ast[0]
-        
-        if node_type == 'number':
-            return {0: Rational(ast[1])}
-        
-        elif node_type == 'variable':
-            if ast[1] == variable:
-                return {1: Rational(1)}  # x^1
-            else:
-                # It's a different variable, treat as constant
-                val = self.evaluator.get_variable(ast[1])
-                if val is None:
-                    raise NameError(f"Variable '{ast[1]}' is not defined")
-                if not isinstance(val, (Rational, int, float)):
-                    raise TypeError(f"Variable '{ast[1]}' must be a number in equations")
-                return {0: Rational(val) if not isinstance(val, Rational) else val}
-        
-        elif node_type == 'binop':
-            op = ast[1]
-            left = self.ast_to_polynomial(ast[2], variable)
-            right = self.ast_to_polynomial(ast[3], variable)
-            
-            if op == '+':
-                result = {}
-                for power, coeff in left.items():
-                    result[power] = result.get(power, Rational(0)) + coeff
-                for power, coeff in right.items():
-                    result[power] = result.get(power, Rational(0)) + coeff
-                return result
-            
-            elif op == '-':
-                result = {}
-                for power, coeff in left.items():
-                    result[power] = result.get(power, Rational(0)) + coeff
-                for power, coeff in right.items():
-                    result[power] = result.get(power, Rational(0)) - coeff
-                return result
-            
-            elif op == '*':
-                result = {}
-                for p1, c1 in left.items():
-                    for p2, c2 in right.items():
-                        power = p1 + p2
-                        result[power] = result.get(power, Rational(0)) + c1 * c2
-                return result
-            
-            elif op == '^':
-                # Handle x^n where n is a constant
-                # left should be the variable, right should be constant
-                if len(left) == 1 and 1 in left and left[1].value == 1:
-                    # It's x^n
-                    if len(right) == 1 and 0 in right:
-                        coeff = right[0]
-                        power = int(coeff.value)
-                        return {power: Rational(1)}
-                raise ValueError("Only simple polynomial forms are supported")
-            
-            else:
-                raise ValueError(f"Operator '{op}' not supported in polynomial equations")
-        
-        elif node_type == 'unary':
-            op = ast[1]
-            operand = self.ast_to_polynomial(ast[2], variable)
-            if op == '-':
-                result = {}
-                for power, coeff in operand.items():
-                    result[power] = -coeff
-                return result
-            raise ValueError(f"Unary operator '{op}' not supported")
-        
-        else:
-            raise ValueError(f"Node type '{node_type}' not supported in equations")
-    
-    def format_polynomial(self, coeffs: dict, variable: str) -> str:
-        """Format polynomial coefficients as a string."""
-        if not coeffs or all(c.value == 0 for c in coeffs.values()):
+            return [_R0]
+
+        handler = self._poly_node_handlers.get(ast[0])
+        if handler is None:
+            raise ValueError(f"Node type '{ast[0]}' not supported in equations")
+        return handler(ast, variable)
+
+    def _poly_number(self, ast, variable: str) -> list:
+        text = ast[1]
+        if '.' not in text:
+            # Integer literals are interned for small values
+            return [Rational.from_int(int(text))]
+        return [Rational(text)]
+
+    def _poly_variable(self, ast, variable: str) -> list:
+        if ast[1] == variable:
+            return [_R0, _R1]  # x^1
+        # It's a different variable, treat as constant
+        val = self.evaluator.get_variable(ast[1])
+        if val is None:
+            raise NameError(f"Variable '{ast[1]}' is not defined")
+        try:
+            return [Rational.coerce(val)]
+        except TypeError:
+            raise TypeError(f"Variable '{ast[1]}' must be a number in equations")
+
+    def _poly_binop(self, ast, variable: str) -> list:
+        op_handler = self._poly_op_handlers.get(ast[1])
+        if op_handler is None:
+            raise ValueError(f"Operator '{ast[1]}' not supported in polynomial equations")
+        left = self.ast_to_polynomial(ast[2], variable)
+        right = self.ast_to_polynomial(ast[3], variable)
+        return op_handler(left, right)
+
+    def _poly_mul(self, left: list, right: list) -> list:
+        # Allocate the product at its final size up front
+        result = [_R0] * (len(left) + len(right) - 1)
+        for p1, c1 in enumerate(left):
+            for p2, c2 in enumerate(right):
+                power = p1 + p2
+                result[power] = result[power] + c1 * c2
+        return result
+
+    def _poly_pow(self, left: list, right: list) -> list:
+        # Handle x^n where n is a constant
+        # left should be the variable, right should be constant
+        if len(left) == 2 and left[0].value == 0 and left[1].value == 1:
+            # It's x^n
+            if len(right) == 1:
+                power = int(right[0].value)
+                return [_R0] * power + [_R1]
+        raise ValueError("Only simple polynomial forms are supported")
+
+    def _poly_unary(self, ast, variable: str) -> list:
+        if ast[1] == '-':
+            return [-coeff for coeff in self.ast_to_polynomial(ast[2], variable)]
+        raise ValueError(f"Unary operator '{ast[1]}' not supported")
+
+    def format_polynomial(self, coeffs: list, variable: str) -> str:
+        """Format polynomial coefficients (list indexed by power) as a string.
+
+        The solver trims trailing zeros before calling, so the all-zero
+        polynomial is just the single-entry [0] list — no full scan needed.
+        """
+        if len(coeffs) == 1 and coeffs[0].value == 0:
             return "0"
-        
-        powers = sorted(coeffs.keys(), reverse=True)
+
         terms = []
-        
-        for power in powers:
+
+        for power in range(len(coeffs) - 1, -1, -1):
             coeff = coeffs[power]
-            if coeff.value == 0:
+            sign = coeff.value
+            if sign == 0:
                 continue
-            
-            term = ""
-            coeff_str = str(coeff)
-            
+
+            # Build the unsigned term body once, then attach the sign in the
+            # same pass: the first term carries a bare '-', later terms get
+            # '+ '/'- ' joiners — no startswith re-scan or string rewriting.
+            magnitude = -coeff if sign < 0 else coeff
             if power == 0:
-                term = coeff_str
+                body = str(magnitude)
+            elif magnitude.value == 1:
+                body = variable if power == 1 else f"{variable}^{power}"
             elif power == 1:
-                if coeff.value == 1:
-                    term = variable
-                elif coeff.value == -1:
-                    term = f"-{variable}"
-                else:
-                    term = f"{coeff_str} * {variable}"
+                body = f"{magnitude} * {variable}"
             else:
-                if coeff.value == 1:
-                    term = f"{variable}^{power}"
-                elif coeff.value == -1:
-                    term = f"-{variable}^{power}"
-                else:
-                    term = f"{coeff_str} * {variable}^{power}"
-            
-            # Handle signs
-            if terms and coeff.value > 0:
-                term = "+ " + term
-            elif terms and coeff.value < 0 and term.startswith("-"):
-                term = "- " + term[1:]
-            
-            terms.append(term)
-        
+                body = f"{magnitude} * {variable}^{power}"
+
+            if not terms:
+                terms.append(f"-{body}" if sign < 0 else body)
+            else:
+                terms.append(f"- {body}" if sign < 0 else f"+ {body}")
+
         return " ".join(terms) if terms else "0"
@@ -5,113 +5,234 @@ Includes: Rational, Complex, Matrix types
 
 from fractions import Fraction
 from typing import Union, List
+import operator
 import re
 
 
 class Rational:
     """Rational number representation using Fraction."""
-    
+
+    # Slots drop the per-instance __dict__ (~60 bytes each) and make .value
+    # loads a fixed-offset read. _str_cache stays unset until the first
+    # __str__ call so the allocation fast paths pay nothing for it.
+    __slots__ = ('value', '_str_cache')
+
     def __init__(self, value):
-        if isinstance(value, Fraction):
+        t = type(value)
+        if t is int:
+            # Integers are already exact: Fraction(n) is trivial, and the
+            # bounded best-rational search in limit_denominator would only
+            # re-derive n/1.
+            self.value = Fraction(value)
+        elif t is Fraction:
+            self.value = value
+        elif t is Rational:
+            self.value = value.value
+        elif t is float and value.is_integer():
+            # Exact-integer floats (0.0, 2.0, ...) also skip the search
+            self.value = Fraction(int(value))
+        elif isinstance(value, Fraction):
             self.value = value
         elif isinstance(value, Rational):
             self.value = value.value
-        elif isinstance(value, (int, float)):
-            self.value = Fraction(value).limit_denominator()
-        elif isinstance(value, str):
-            self.value = Fraction(value).limit_denominator()
         else:
             self.value = Fraction(value).limit_denominator()
     
+    @classmethod
+    def _from_fraction(cls, f) -> 'Rational':
+        """Wrap an already-reduced Fraction without running __init__.
+
+        Fraction arithmetic always returns normalized results, so the
+        constructor's type dispatch is pure overhead on the arithmetic
+        fast paths; this allocates the instance and stores the value
+        directly.
+        """
+        obj = cls.__new__(cls)
+        obj.value = f
+        return obj
+
+    # Dispatch in every dunder starts with an exact type compare: the
+    # dominant Rational-Rational case is a single pointer check instead of
+    # an isinstance MRO walk, and unknown types return NotImplemented so
+    # Python can try the reflected operation on the other operand.
     def __add__(self, other):
-        if isinstance(other, Rational):
-            return Rational(self.value + other.value)
-        elif isinstance(other, (int, float)):
-            return Rational(self.value + Fraction(other))
-        elif isinstance(other, Complex):
+        t = type(other)
+        if t is Rational:
+            return Rational._from_fraction(self.value + other.value)
+        if t is int or t is float:
+            return Rational._from_fraction(self.value + Fraction(other))
+        if t is Complex:
             # Convert to Complex and add
             return Complex(self, 0) + other
-        raise TypeError(f"Cannot add Rational and {type(other)}")
-    
+        return NotImplemented
+
+    __radd__ = __add__  # addition is commutative
+
     def __sub__(self, other):
-        if isinstance(other, Rational):
-            return Rational(self.value - other.value)
-        elif isinstance(other, (int, float)):
-            return Rational(self.value - Fraction(other))
-        elif isinstance(other, Complex):
+        t = type(other)
+        if t is Rational:
+            return Rational._from_fraction(self.value - other.value)
+        if t is int or t is float:
+            return Rational._from_fraction(self.value - Fraction(other))
+        if t is Complex:
             # Convert to Complex and subtract
             return Complex(self, 0) - other
-        raise TypeError(f"Cannot subtract Rational and {type(other)}")
-    
+        return NotImplemented
+
     def __mul__(self, other):
-        if isinstance(other, Rational):
-            return Rational(self.value * other.value)
-        elif isinstance(other, (int, float)):
-            return Rational(self.value * Fraction(other))
-        elif isinstance(other, Complex):
+        t = type(other)
+        if t is Rational:
+            return Rational._from_fraction(self.value * other.value)
+        if t is int or t is float:
+            return Rational._from_fraction(self.value * Fraction(other))
+        if t is Complex:
             # Convert to Complex and multiply
             return Complex(self, 0) * other
-        raise TypeError(f"Cannot multiply Rational and {type(other)}")
-    
+        return NotImplemented
+
+    __rmul__ = __mul__  # multiplication is commutative
+
     def __truediv__(self, other):
-        if isinstance(other, Rational):
-            if other.value == 0:
+        t = type(other)
+        if t is Rational:
+            # numerator probe: no Fraction(0) construction for the == check
+            if other.value.numerator == 0:
                 raise ZeroDivisionError("Division by zero")
-            return Rational(self.value / other.value)
-        elif isinstance(other, (int, float)):
+            return Rational._from_fraction(self.value / other.value)
+        if t is int or t is float:
             if other == 0:
                 raise ZeroDivisionError("Division by zero")
-            return Rational(self.value / Fraction(other))
-        elif isinstance(other, Complex):
+            return Rational._from_fraction(self.value / Fraction(other))
+        if t is Complex:
             # Convert to Complex and divide
             return Complex(self, 0) / other
-        raise TypeError(f"Cannot divide Rational and {type(other)}")
-    
+        return NotImplemented
+
     def __pow__(self, other):
-        if isinstance(other, Rational):
+        t = type(other)
+        if t is Rational:
             exp = other.value
             if exp.denominator == 1:
-                return Rational(self.value ** int(exp))
+                n = exp.numerator
             else:
                 # For fractional powers, convert to float
                 return Rational(float(self.value) ** float(exp))
-        elif isinstance(other, int):
-            return Rational(self.value ** other)
-        raise TypeError(f"Cannot exponentiate Rational with {type(other)}")
+        elif t is int:
+            n = other
+        else:
+            return NotImplemented
+        # Integer exponents, by frequency: x^2 dominates (quadratics),
+        # then the trivial cases, then the general path.
+        if n == 2:
+            v = self.value
+            return Rational._from_fraction(v * v)
+        if n == 1:
+            return self
+        if n == 0:
+            return Rational.ONE
+        v = self.value
+        if v.denominator == 1 and n > 0:
+            # Whole-number base: one C-level int pow, no denominator work
+            return Rational._from_fraction(Fraction(pow(v.numerator, n)))
+        return Rational._from_fraction(v ** n)
     
     def __neg__(self):
-        return Rational(-self.value)
+        return Rational._from_fraction(-self.value)
     
     def __str__(self):
-        if self.value.denominator == 1:
-            return str(self.value.numerator)
-        return f"{self.value.numerator}/{self.value.denominator}"
-    
+        # Values are immutable, so the rendered form is cached on first
+        # use: repeated printing (REPL echo, matrix rendering, repr) of
+        # the same instance costs one attribute load afterwards.
+        try:
+            return self._str_cache
+        except AttributeError:
+            pass
+        v = self.value
+        s = str(v.numerator) if v.denominator == 1 else f"{v.numerator}/{v.denominator}"
+        self._str_cache = s
+        return s
+
+    def __rsub__(self, other):
+        t = type(other)
+        if t is int or t is float:
+            return Rational._from_fraction(Fraction(other) - self.value)
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        t = type(other)
+        if t is int or t is float:
+            if self.value.numerator == 0:
+                raise ZeroDivisionError("Division by zero")
+            return Rational._from_fraction(Fraction(other) / self.value)
+        return NotImplemented
+
     def __repr__(self):
         return f"Rational({str(self)})"
     
     def __eq__(self, other):
-        if isinstance(other, Rational):
+        if type(other) is Rational:
             return self.value == other.value
+        if type(other) is int:
+            # Compare against ints without building a Fraction on the RHS:
+            # 'rat == 0' style checks reduce to two int compares.
+            v = self.value
+            return v.denominator == 1 and v.numerator == other
         return False
 
+    @classmethod
+    def from_int(cls, n: int) -> 'Rational':
+        """Return a Rational for an int, interned for small values.
+
+        Small integers dominate coefficients and exponents in typical
+        input, so values in [-256, 256] come from a shared cache (the
+        same idea as CPython's small-int cache) instead of allocating a
+        fresh Fraction every time.
+        """
+        cached = cls._small_ints.get(n)
+        return cached if cached is not None else cls(n)
+
+    @staticmethod
+    def coerce(value) -> 'Rational':
+        """Return value as a Rational, wrapping plain ints/floats.
+
+        Exact `type(...) is` checks instead of isinstance: Rational is
+        never subclassed here, so the common already-Rational case is a
+        single pointer compare with no MRO walk. Anything non-numeric
+        raises TypeError for the caller to contextualize.
+        """
+        if type(value) is Rational:
+            return value
+        if type(value) is int or type(value) is float:
+            return Rational(value)
+        raise TypeError(f"Cannot coerce {type(value)} to Rational")
+
     def __mod__(self, other):
         """Modulo operation for rationals."""
-        from fractions import Fraction
-        if isinstance(other, Rational):
-            if other.value == 0:
+        t = type(other)
+        if t is Rational:
+            if other.value.numerator == 0:
                 raise ZeroDivisionError("Modulo by zero")
-            return Rational(self.value % other.value)
-        elif isinstance(other, (int, float)):
+            return Rational._from_fraction(self.value % other.value)
+        if t is int or t is float:
             if other == 0:
                 raise ZeroDivisionError("Modulo by zero")
-            return Rational(self.value % Fraction(other))
-        raise TypeError(f"Cannot modulo Rational and {type(other)}")
+            return Rational._from_fraction(self.value % Fraction(other))
+        return NotImplemented
+
+
+# Shared flyweights: Rational values are never mutated, so every zero/one
+# cell (identity matrices, default coefficients) can reuse these objects.
+# The small-int cache backs Rational.from_int; ZERO/ONE alias its entries.
+Rational._small_ints = {i: Rational(i) for i in range(-256, 257)}
+Rational.ZERO = Rational._small_ints[0]
+Rational.ONE = Rational._small_ints[1]
 
 
 class Complex:
     """Complex number with rational coefficients."""
-    
+
+    __slots__ = ('real', 'imag')
+
     def __init__(self, real, imag=0):
         if isinstance(real, Rational):
             self.real = real
@@ -123,47 +244,81 @@ class Complex:
         else:
             self.imag = Rational(imag)
     
+    # Same dispatch shape as Rational: exact type compare first, then the
+    # scalar branch, NotImplemented for anything unknown.
     def __add__(self, other):
-        if isinstance(other, Complex):
+        t = type(other)
+        if t is Complex:
             return Complex(self.real + other.real, self.imag + other.imag)
-        elif isinstance(other, (Rational, int, float)):
+        if t is Rational:
+            return Complex(self.real + other, self.imag)
+        if t is int or t is float:
             return Complex(self.real + Rational(other), self.imag)
-        raise TypeError(f"Cannot add Complex and {type(other)}")
-    
+        return NotImplemented
+
+    __radd__ = __add__  # addition is commutative
+
     def __sub__(self, other):
-        if isinstance(other, Complex):
+        t = type(other)
+        if t is Complex:
             return Complex(self.real - other.real, self.imag - other.imag)
-        elif isinstance(other, (Rational, int, float)):
+        if t is Rational:
+            return Complex(self.real - other, self.imag)
+        if t is int or t is float:
             return Complex(self.real - Rational(other), self.imag)
-        raise TypeError(f"Cannot subtract Complex and {type(other)}")
-    
+        return NotImplemented
+
     def __mul__(self, other):
-        if isinstance(other, Complex):
-            # (a + bi)(c + di) = (ac - bd) + (ad + bc)i
-            real = self.real * other.real - self.imag * other.imag
-            imag = self.real * other.imag + self.imag * other.real
-            return Complex(real, imag)
-        elif isinstance(other, (Rational, int, float)):
+        t = type(other)
+        if t is Complex:
+            # (a + bi)(c + di) via Gauss's trick: three Rational multiplies
+            # instead of four. Each multiply runs a full Fraction gcd
+            # reduction, so trading one for two cheap additions wins.
+            #   t1 = (a + b)(c + d); t2 = ac; t3 = bd
+            #   real = t2 - t3; imag = t1 - t2 - t3
+            a, b = self.real, self.imag
+            c, d = other.real, other.imag
+            t1 = (a + b) * (c + d)
+            t2 = a * c
+            t3 = b * d
+            return Complex(t2 - t3, t1 - t2 - t3)
+        if t is Rational:
+            return Complex(self.real * other, self.imag * other)
+        if t is int or t is float:
             rat = Rational(other)
             return Complex(self.real * rat, self.imag * rat)
-        raise TypeError(f"Cannot multiply Complex and {type(other)}")
-    
+        return NotImplemented
+
+    __rmul__ = __mul__  # multiplication is commutative
+
     def __truediv__(self, other):
-        if isinstance(other, Complex):
+        t = type(other)
+        if t is Complex:
             # (a + bi)/(c + di) = [(a + bi)(c - di)] / (c² + d²)
             denom = other.real * other.real + other.imag * other.imag
-            if denom.value == 0:
+            if denom.value.numerator == 0:
                 raise ZeroDivisionError("Division by zero")
             real = (self.real * other.real + self.imag * other.imag) / denom
             imag = (self.imag * other.real - self.real * other.imag) / denom
             return Complex(real, imag)
-        elif isinstance(other, (Rational, int, float)):
-            rat = Rational(other)
-            if rat.value == 0:
+        if t is Rational or t is int or t is float:
+            rat = other if type(other) is Rational else Rational(other)
+            if rat.value.numerator == 0:
                 raise ZeroDivisionError("Division by zero")
             return Complex(self.real / rat, self.imag / rat)
-        raise TypeError(f"Cannot divide Complex and {type(other)}")
+        return NotImplemented
     
+    def __rsub__(self, other):
+        if isinstance(other, (Rational, int, float)):
+            rat = other if type(other) is Rational else Rational(other)
+            return Complex(rat - self.real, -self.imag)
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        if isinstance(other, (Rational, int, float)):
+            return Complex(other, 0) / self
+        return NotImplemented
+
     def __neg__(self):
         return Complex(-self.real, -self.imag)
     
@@ -212,43 +367,52 @@ class Matrix:
             if len(row) != self.cols:
                 raise ValueError("All rows must have the same length")
         
-        self.data = []
-        for row in data:
-            new_row = []
-            for elem in row:
-                if isinstance(elem, Rational):
-                    new_row.append(elem)
-                else:
-                    new_row.append(Rational(elem))
-            self.data.append(new_row)
-    
+        self.data = [
+            [elem if isinstance(elem, Rational) else Rational(elem) for elem in row]
+            for row in data
+        ]
+        self._str_cache = None
+
+    @classmethod
+    def _unsafe(cls, data, rows: int, cols: int) -> 'Matrix':
+        """Build a Matrix from an internally-produced nested list.
+
+        The arithmetic methods already emit correctly-shaped rows of
+        Rational, so the shape scan and per-element rewrap that __init__
+        performs would be O(n^2) wasted work; this trusts the caller and
+        just installs the fields.
+        """
+        obj = cls.__new__(cls)
+        obj.rows = rows
+        obj.cols = cols
+        obj.data = data
+        obj._str_cache = None
+        return obj
+
     def __add__(self, other):
         if not isinstance(other, Matrix):
-            raise TypeError("Can only add Matrix to Matrix")
+            return NotImplemented
         if self.rows != other.rows or self.cols != other.cols:
             raise ValueError("Matrices must have same dimensions for addition")
-        
-        result = []
-        for i in range(self.rows):
-            row = []
-            for j in range(self.cols):
-                row.append(self.data[i][j] + other.data[i][j])
-            result.append(row)
-        return Matrix(result)
+
+        # Paired-row comprehension: no index arithmetic or append dispatch
+        result = [
+            [a + b for a, b in zip(srow, orow)]
+            for srow, orow in zip(self.data, other.data)
+        ]
+        return Matrix._unsafe(result, self.rows, self.cols)
     
     def __sub__(self, other):
         if not isinstance(other, Matrix):
-            raise TypeError("Can only subtract Matrix from Matrix")
+            return NotImplemented
         if self.rows != other.rows or self.cols != other.cols:
             raise ValueError("Matrices must have same dimensions for subtraction")
-        
-        result = []
-        for i in range(self.rows):
-            row = []
-            for j in range(self.cols):
-                row.append(self.data[i][j] - other.data[i][j])
-            result.append(row)
-        return Matrix(result)
+
+        result = [
+            [a - b for a, b in zip(srow, orow)]
+            for srow, orow in zip(self.data, other.data)
+        ]
+        return Matrix._unsafe(result, self.rows, self.cols)
     
     def __mul__(self, other):
         if isinstance(other, Matrix):
@@ -256,24 +420,69 @@ class Matrix:
             if self.rows != other.rows or self.cols != other.cols:
                 raise ValueError("Matrix dimensions must match for element-wise multiplication")
 
-            result = []
-            for i in range(self.rows):
-                row = []
-                for j in range(self.cols):
-                    row.append(self.data[i][j] * other.data[i][j])
-                result.append(row)
-            return Matrix(result)
+            result = [
+                [a * b for a, b in zip(srow, orow)]
+                for srow, orow in zip(self.data, other.data)
+            ]
+            return Matrix._unsafe(result, self.rows, self.cols)
         elif isinstance(other, (Rational, int, float)):
             # Scalar multiplication
-            rat = Rational(other) if not isinstance(other, Rational) else other
-            result = []
-            for i in range(self.rows):
-                row = []
-                for j in range(self.cols):
-                    row.append(self.data[i][j] * rat)
-                result.append(row)
-            return Matrix(result)
-        raise TypeError(f"Cannot multiply Matrix and {type(other)}")
+            rat = other if type(other) is Rational else Rational(other)
+            result = [[x * rat for x in srow] for srow in self.data]
+            return Matrix._unsafe(result, self.rows, self.cols)
+        return NotImplemented
+
+    # scalar * matrix commutes (element-wise matrix * matrix does too)
+    __rmul__ = __mul__
+
+    # In-place variants for accumulation patterns (C += A, C *= s): they
+    # rewrite the existing rows instead of building a new nested list and
+    # re-validating it through __init__, so no per-step Matrix allocation.
+    def _mark_mutated(self):
+        """Drop cached renderings after an in-place update.
+
+        Clears the __str__ cache and any _repr_cache a display layer
+        (Interpreter.format_result) attached to this instance; both hold
+        the pre-mutation rendering.
+        """
+        self._str_cache = None
+        self.__dict__.pop('_repr_cache', None)
+
+    def __iadd__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Matrices must have same dimensions for addition")
+        for srow, orow in zip(self.data, other.data):
+            srow[:] = [a + b for a, b in zip(srow, orow)]
+        self._mark_mutated()
+        return self
+
+    def __isub__(self, other):
+        if not isinstance(other, Matrix):
+            return NotImplemented
+        if self.rows != other.rows or self.cols != other.cols:
+            raise ValueError("Matrices must have same dimensions for subtraction")
+        for srow, orow in zip(self.data, other.data):
+            srow[:] = [a - b for a, b in zip(srow, orow)]
+        self._mark_mutated()
+        return self
+
+    def __imul__(self, other):
+        if isinstance(other, Matrix):
+            if self.rows != other.rows or self.cols != other.cols:
+                raise ValueError("Matrix dimensions must match for element-wise multiplication")
+            for srow, orow in zip(self.data, other.data):
+                srow[:] = [a * b for a, b in zip(srow, orow)]
+            self._mark_mutated()
+            return self
+        elif isinstance(other, (Rational, int, float)):
+            rat = other if type(other) is Rational else Rational(other)
+            for srow in self.data:
+                srow[:] = [x * rat for x in srow]
+            self._mark_mutated()
+            return self
+        return NotImplemented
 
     def matmul(self, other):
         """Matrix multiplication (dot product) operator for Matrix objects."""
@@ -282,16 +491,35 @@ class Matrix:
         if self.cols != other.rows:
             raise ValueError("Matrix dimensions incompatible for multiplication")
 
-        result = []
-        for i in range(self.rows):
-            row = []
-            for j in range(other.cols):
-                sum_val = Rational(0)
-                for k in range(self.cols):
-                    sum_val = sum_val + (self.data[i][k] * other.data[k][j])
-                row.append(sum_val)
-            result.append(row)
-        return Matrix(result)
+        # Transpose B once so each output cell is a dot product of two
+        # contiguous sequences: sum(map(mul, ...)) runs the whole inner
+        # loop at C level instead of per-k bytecode with a strided
+        # other.data[k][j] column access.
+        b_cols = list(zip(*other.data))
+        mul = operator.mul
+        zero = Rational.ZERO
+        result = [
+            [sum(map(mul, a_row, b_col), zero) for b_col in b_cols]
+            for a_row in self.data
+        ]
+        return Matrix._unsafe(result, self.rows, other.cols)
+
+    # Per-size identity row templates; cells share the Rational flyweights
+    # and __init__ copies rows into fresh lists, so instances are isolated.
+    _identity_cache = {}
+
+    @classmethod
+    def identity(cls, n: int) -> 'Matrix':
+        """Return a new n x n identity matrix (cached row template)."""
+        template = cls._identity_cache.get(n)
+        if template is None:
+            one, zero = Rational.ONE, Rational.ZERO
+            template = tuple(
+                tuple(one if i == j else zero for j in range(n))
+                for i in range(n)
+            )
+            cls._identity_cache[n] = template
+        return cls(template)
 
     def is_vector(self):
         """Return True if this Matrix is a 1-D vector (either 1xN or Nx1)."""
@@ -355,15 +583,18 @@ class Matrix:
             for j in range(n):
                 row.append(aug[i][n + j])
             inv_data.append(row)
-        return Matrix(inv_data)
+        return Matrix._unsafe(inv_data, n, n)
     
     def __str__(self):
-        # Render each row on its own line for readability, without outer brackets
-        lines = []
-        for row in self.data:
-            elements = [str(elem) for elem in row]
-            lines.append("[ " + " , ".join(elements) + " ]")
-        return "\n".join(lines)
+        # Render each row on its own line for readability, without outer
+        # brackets. The rendering is cached: matrices are only mutated by
+        # the in-place operators, which drop the cache.
+        s = self._str_cache
+        if s is None:
+            s = "\n".join("[ " + " , ".join(map(str, row)) + " ]"
+                          for row in self.data)
+            self._str_cache = s
+        return s
     
     def __repr__(self):
         return f"Matrix({self.data})"